@@ -2,6 +2,7 @@ import warnings
 from datetime import datetime
 from pathlib import Path
 from agentapp.crew import Agentapp
+from agentapp.ignore_rules import IGNORE_FILE_NAMES, IgnoreMatcher
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 from flask import Flask, request, jsonify
 from flask_cors import CORS
@@ -42,6 +43,41 @@ backend_dir = outputs_dir / "backend"
 def index():
     return '<h1>Hello, World!</h1>'
 
+def _note_ignore_files(directory, rel_dir, names, ignore_files):
+    """Record the modification times of the ignore files among names"""
+    for name in IGNORE_FILE_NAMES:
+        if name in names:
+            try:
+                ignore_files[os.path.join(rel_dir, name)] = os.stat(os.path.join(directory, name)).st_mtime_ns
+            except OSError:
+                pass
+
+def _list_output_files(base_dir, matcher, ignore_files):
+    """Return paths (relative to outputs_dir) of the visible files below base_dir.
+
+    Ignore files seen on the way are added to ignore_files with their mtimes.
+    """
+    files = set()
+    if not base_dir.exists():
+        return files
+    for root, dirs, names in os.walk(base_dir):
+        rel_root = os.path.relpath(root, outputs_dir)
+        _note_ignore_files(root, rel_root, names, ignore_files)
+        # Pruning dirs keeps os.walk out of node_modules, build output, etc.
+        dirs[:] = [d for d in dirs if not matcher.is_ignored(os.path.join(rel_root, d), True)]
+        names = [f for f in names if not matcher.is_ignored(os.path.join(rel_root, f), False)]
+        files.update(os.path.join(rel_root, f) for f in names)
+    return files
+
+def _list_outputs(matcher):
+    """Return (frontend files, backend files, {ignore file: mtime}) for one pass"""
+    ignore_files = {}
+    if outputs_dir.exists():
+        _note_ignore_files(outputs_dir, '', os.listdir(outputs_dir), ignore_files)
+    frontend_files = _list_output_files(frontend_dir, matcher, ignore_files)
+    backend_files = _list_output_files(backend_dir, matcher, ignore_files)
+    return frontend_files, backend_files, ignore_files
+
 def monitor_file_creation():
     """Monitor file creation in outputs directory and update progress"""
     global generation_status
@@ -50,35 +86,25 @@ def monitor_file_creation():
     prev_frontend_count = 0
     prev_backend_count = 0
     prev_files = set()
+    # Ignore rules are cached per folder until their ignore file changes
+    matcher = IgnoreMatcher(outputs_dir)
+    prev_ignore_files = None
     
     while generation_status['is_generating']:
         try:
-            # Count files in frontend directory
-            frontend_count = 0
-            if frontend_dir.exists():
-                for root, dirs, files in os.walk(frontend_dir):
-                    frontend_count += len([f for f in files if not f.startswith('.')])
-            
-            # Count files in backend directory
-            backend_count = 0
-            if backend_dir.exists():
-                for root, dirs, files in os.walk(backend_dir):
-                    backend_count += len([f for f in files if not f.startswith('.')])
-            
-            # Get current files
-            current_files = set()
-            if frontend_dir.exists():
-                for root, dirs, files in os.walk(frontend_dir):
-                    for f in files:
-                        if not f.startswith('.'):
-                            rel_path = os.path.relpath(os.path.join(root, f), frontend_dir)
-                            current_files.add(f'frontend/{rel_path}')
-            if backend_dir.exists():
-                for root, dirs, files in os.walk(backend_dir):
-                    for f in files:
-                        if not f.startswith('.'):
-                            rel_path = os.path.relpath(os.path.join(root, f), backend_dir)
-                            current_files.add(f'backend/{rel_path}')
+            # One walk per folder, skipping ignored entries
+            frontend_files, backend_files, ignore_files = _list_outputs(matcher)
+            if prev_ignore_files is not None and ignore_files != prev_ignore_files:
+                # An ignore file was added, edited or removed: reload the
+                # rules of its folder and list again with them
+                for path in ignore_files.keys() | prev_ignore_files.keys():
+                    if ignore_files.get(path) != prev_ignore_files.get(path):
+                        matcher.invalidate(os.path.dirname(path))
+                frontend_files, backend_files, ignore_files = _list_outputs(matcher)
+            prev_ignore_files = ignore_files
+            frontend_count = len(frontend_files)
+            backend_count = len(backend_files)
+            current_files = frontend_files | backend_files
             
             # Detect new files
             new_files = current_files - prev_files
@@ -3,6 +3,12 @@ from typing import Type
 from pydantic import BaseModel, Field
 import os
 from pathlib import Path
+from agentapp.path_resolver import PathResolver, PathEscapeError
+
+# Outputs directory is: agentapp/src/agentapp/outputs/
+OUTPUTS_DIR = Path(__file__).parent.parent / "outputs"
+# Caches folder real paths across calls
+_resolver = PathResolver(OUTPUTS_DIR)
 
 
 class FileCreatorToolInput(BaseModel):
@@ -26,19 +32,11 @@ class FileCreatorTool(BaseTool):
     def _run(self, file_path: str, content: str, create_directories: bool = True) -> str:
         """Create a file with the given content."""
         try:
-            # Get the outputs directory path
-            # This file is in: agentapp/src/agentapp/tools/
-            # Outputs directory is: agentapp/src/agentapp/outputs/
-            current_file = Path(__file__)
-            outputs_dir = current_file.parent.parent / "outputs"
-            outputs_dir = outputs_dir.resolve()
-            
-            # Construct the full file path
-            full_path = outputs_dir / file_path
-            full_path = full_path.resolve()
-            
-            # Security check: ensure the file is within the outputs directory
-            if not str(full_path).startswith(str(outputs_dir)):
+            # Security check: ensure the file is within the outputs directory,
+            # by whole path components and after following symlinks
+            try:
+                full_path = Path(_resolver.resolve(file_path))
+            except PathEscapeError:
                 return f"Error: File path '{file_path}' is outside the outputs directory. Security violation."
             
             # Create parent directories if needed
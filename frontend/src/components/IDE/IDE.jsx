@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react'
 import { useDocument } from '@automerge/react'
+import { io } from 'socket.io-client'
 import FileExplorer from './FileExplorer'
 import CodeEditor from './CodeEditor'
 import Terminal from './Terminal'
@@ -27,6 +28,40 @@ const getBackendUrl = () => {
 const BACKEND_URL = getBackendUrl();
 console.log(`🔌 IDE Backend URL: ${BACKEND_URL}`);
 
+// The backend counts patch offsets in Unicode code points, not UTF-16 units
+const codePointLength = (text) => {
+  let length = 0
+  for (const _ of text) length++
+  return length
+}
+
+// Describe the change from oldText to newText as a single replacement edit
+const computeEdit = (oldText, newText) => {
+  let start = 0
+  const maxStart = Math.min(oldText.length, newText.length)
+  while (start < maxStart && oldText[start] === newText[start]) start++
+  // Don't split a surrogate pair
+  if (start > 0 && start < maxStart && oldText.charCodeAt(start - 1) >= 0xd800 && oldText.charCodeAt(start - 1) <= 0xdbff) start--
+
+  let oldEnd = oldText.length
+  let newEnd = newText.length
+  while (oldEnd > start && newEnd > start && oldText[oldEnd - 1] === newText[newEnd - 1]) {
+    oldEnd--
+    newEnd--
+  }
+  if (oldEnd < oldText.length && oldText.charCodeAt(oldEnd) >= 0xdc00 && oldText.charCodeAt(oldEnd) <= 0xdfff) {
+    oldEnd++
+    newEnd++
+  }
+
+  const prefix = oldText.slice(0, start)
+  return {
+    offset: codePointLength(prefix),
+    length: codePointLength(oldText.slice(start, oldEnd)),
+    text: newText.slice(start, newEnd)
+  }
+}
+
 function IDE({ repo, rootHandle }) {
   const [files, setFiles] = useState({})
   const [openFiles, setOpenFiles] = useState([])
@@ -35,6 +70,10 @@ function IDE({ repo, rootHandle }) {
   const [isGenerating, setIsGenerating] = useState(false)
   const [generationStatus, setGenerationStatus] = useState(null)
   const terminalRef = useRef(null)
+  // Last content known to be on the backend, per file: { content, hash }
+  const savedFilesRef = useRef({})
+  // Per-file promise chain so saves reach the backend in order
+  const saveQueueRef = useRef({})
   
   // Get agent backend URL (different from IDE backend)
   const getAgentBackendUrl = () => {
@@ -159,6 +198,27 @@ function IDE({ repo, rootHandle }) {
     checkGenerationStatus()
   }, [])
   
+  // Reload the file tree whenever the backend pushes file system changes,
+  // so files written by the agents show up without polling
+  useEffect(() => {
+    const socket = io(BACKEND_URL, {
+      transports: ['websocket', 'polling'],
+      reconnection: true
+    })
+
+    socket.on('connect', () => {
+      socket.emit('watch_files')
+    })
+
+    socket.on('fs_changed', () => {
+      loadFileTree()
+    })
+
+    return () => {
+      socket.disconnect()
+    }
+  }, [])
+
   // Poll generation status while generating
   useEffect(() => {
     if (!isGenerating) return
@@ -192,7 +252,13 @@ function IDE({ repo, rootHandle }) {
         
         if (response.ok) {
           const data = await response.json()
+          // Binary or very large files come back as metadata only
+          if (data.binary || data.too_large) {
+            console.warn(`Not opening ${filePath} in the editor (${data.binary ? 'binary' : 'too large'}, ${data.size} bytes)`)
+            return
+          }
           const backendContent = data.content || ''
+          savedFilesRef.current[filePath] = { content: backendContent, hash: data.hash }
           
           // Create new Automerge document for this file
           fileHandle = repo.create({
@@ -243,7 +309,12 @@ function IDE({ repo, rootHandle }) {
         })
         if (response.ok) {
           const data = await response.json()
+          if (data.binary || data.too_large) {
+            console.warn(`Not opening ${filePath} in the editor (${data.binary ? 'binary' : 'too large'}, ${data.size} bytes)`)
+            return
+          }
           fileContent = data.content || ''
+          savedFilesRef.current[filePath] = { content: fileContent, hash: data.hash }
         }
       }
       
@@ -297,24 +368,56 @@ function IDE({ repo, rootHandle }) {
     }
 
     // Also save to backend (for persistence and backup)
+    const previousSave = saveQueueRef.current[filePath] || Promise.resolve()
+    saveQueueRef.current[filePath] = previousSave.then(() => saveToBackend(filePath, newContent))
+  }
+
+  // Send only the changed range when the backend's copy is known,
+  // falling back to a full write if the patch conflicts
+  const saveToBackend = async (filePath, newContent) => {
     try {
-      const response = await fetch(`${BACKEND_URL}/api/files/write`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          path: filePath,
-          content: newContent
+      const saved = savedFilesRef.current[filePath]
+      let response = null
+
+      if (saved?.hash) {
+        response = await fetch(`${BACKEND_URL}/api/files/patch`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            path: filePath,
+            base_hash: saved.hash,
+            edits: [computeEdit(saved.content, newContent)]
+          })
         })
-      })
+      }
+
+      if (!response || !response.ok) {
+        response = await fetch(`${BACKEND_URL}/api/files/write`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            path: filePath,
+            content: newContent
+          })
+        })
+      }
 
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({}))
         console.error(`Error saving file to backend: ${errorData.error || 'Unknown error'}`)
+        delete savedFilesRef.current[filePath]
+        return
       }
+
+      const data = await response.json()
+      savedFilesRef.current[filePath] = { content: newContent, hash: data.hash }
     } catch (error) {
       console.error(`Error saving file to backend: ${error.message}`)
+      delete savedFilesRef.current[filePath]
     }
   }
 
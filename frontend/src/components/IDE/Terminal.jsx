@@ -44,6 +44,8 @@ const Terminal = forwardRef(({ workingDir }, ref) => {
   // Initialize socket connection and terminal session
   useEffect(() => {
     let currentSessionId = null
+    let reattachToken = null
+    const outputDecoder = new TextDecoder('utf-8')
 
     try {
       // Connect to backend WebSocket
@@ -56,16 +58,25 @@ const Terminal = forwardRef(({ workingDir }, ref) => {
       })
       socketRef.current = socket
 
-      // Add wildcard event listener to catch ALL events
-      socket.onAny((eventName, ...args) => {
-        console.log('🟢 ANY EVENT RECEIVED:', eventName, args)
-      })
-
       socket.on('connect', () => {
         console.log('✅ Connected to backend - Socket ID:', socket.id)
         console.log('✅ Socket instance:', socket)
         setConnected(true)
 
+        if (currentSessionId && reattachToken) {
+          // Reconnected: the backend keeps our shell running for a while
+          socket.emit('reattach_terminal', {
+            session_id: currentSessionId,
+            reattach_token: reattachToken,
+            flow_control: true,
+            binary: true
+          })
+        } else {
+          createSession()
+        }
+      })
+
+      const createSession = () => {
         // Create terminal session
         // If workingDir is null/undefined/empty, backend will use workspace root (outputs directory)
         currentSessionId = `term_${Date.now()}`
@@ -73,10 +84,12 @@ const Terminal = forwardRef(({ workingDir }, ref) => {
         console.log('✅ Working directory requested:', workingDir || 'default (workspace root)')
         socket.emit('create_terminal', {
           session_id: currentSessionId,
-          working_dir: workingDir || null // null will trigger backend to use workspace root
+          working_dir: workingDir || null, // null will trigger backend to use workspace root
+          flow_control: true, // we ack each terminal_output message below
+          binary: true // output arrives as raw bytes, decoded below
         })
         setSessionId(currentSessionId)
-      })
+      }
 
       socket.on('disconnect', () => {
         console.log('Disconnected from backend')
@@ -91,30 +104,45 @@ const Terminal = forwardRef(({ workingDir }, ref) => {
 
       socket.on('terminal_created', (data) => {
         console.log('✅ Terminal session created:', data.session_id)
+        reattachToken = data.reattach_token
         // Terminal should now be in the outputs directory
         // Show a welcome message with the current directory
         setTerminalOutput(prev => prev + 'Terminal ready. You are in the workspace directory.\r\n')
       })
 
-      socket.on('terminal_output', (data) => {
-        // Backend sends: { session_id, data: output_string }
-        console.log('📥 Terminal output received:', data)
+      socket.on('terminal_output', (data, ack) => {
+        // Backend sends: { session_id, data: bytes } (or a string for text sessions)
         if (data && data.data) {
-          const output = data.data
-          console.log('📥 Output content:', output)
-        setTerminalOutput(prev => {
-            const newOutput = prev + output
-            console.log('📥 Updated terminal output, length:', newOutput.length)
-          return newOutput
-        })
+          // stream: true keeps a character split across messages intact
+          const output = typeof data.data === 'string'
+            ? data.data
+            : outputDecoder.decode(new Uint8Array(data.data), { stream: true })
+          if (output) setTerminalOutput(prev => prev + output)
         } else if (data && data.output) {
           // Fallback if backend sends 'output' instead of 'data'
           setTerminalOutput(prev => prev + data.output)
         }
+        // Acknowledge so the backend keeps reading (flow control)
+        if (typeof ack === 'function') ack()
       })
 
       console.log('📡 Registered terminal_output event listener on socket:', socket.id)
 
+      socket.on('terminal_reattached', (data) => {
+        // The replayed scrollback already contains what was shown before
+        outputDecoder.decode()
+        const replay = typeof data.data === 'string'
+          ? data.data
+          : new TextDecoder('utf-8').decode(new Uint8Array(data.data))
+        setTerminalOutput(replay)
+      })
+
+      socket.on('terminal_reattach_failed', () => {
+        reattachToken = null
+        setTerminalOutput(prev => prev + '\r\nPrevious session ended; starting a new one.\r\n')
+        createSession()
+      })
+
       socket.on('terminal_error', (data) => {
         console.error('Terminal error:', data.error)
         setTerminalOutput(prev => prev + `\r\nError: ${data.error}\r\n`)
@@ -1,11 +1,20 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit, join_room
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import os
+import re
+import json
+import hashlib
 import logging
-import shutil
+from functools import partial
 from terminal_manager import TerminalManager
+from resource_limits import ResourceLimits
 from file_manager import FileManager
+from blocking_io import BlockingIOPool
+from workspace_registry import WorkspaceRegistry, UnknownWorkspace
+from fs_events import FileEventBroadcaster
+from message_queue import socketio_queue_options
+from response_encoding import ResponseCompressor, packed_response
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,8 +22,14 @@ logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-change-this'
+app.config['SECRET_KEY'] = os.environ.get('IDE_SECRET_KEY', 'your-secret-key-change-this')
 CORS(app, resources={r"/*": {"origins": "*"}})
+# Key order carries no meaning for clients; skipping the sort speeds up large trees
+app.json.sort_keys = False
+
+# Workers started by server.py share events through this queue
+message_queue_url = os.environ.get('IDE_MESSAGE_QUEUE')
+worker_id = int(os.environ.get('IDE_WORKER_ID', '0'))
 
 # Initialize SocketIO with increased timeout settings
 socketio = SocketIO(
@@ -24,7 +39,8 @@ socketio = SocketIO(
     ping_timeout=120,      # Wait 120 seconds for pong before closing
     ping_interval=25,      # Send ping every 25 seconds
     engineio_logger=False,
-    logger=False
+    logger=False,
+    **socketio_queue_options(message_queue_url)
 )
 
 # Initialize managers
@@ -43,7 +59,84 @@ workspace_path = outputs_path
 logger.info(f'IDE workspace set to outputs directory: {workspace_path}')
 logger.info(f'IDE will ONLY show files from: {workspace_path}')
 
-file_manager = FileManager(workspace_root=workspace_path)
+# Write durability ('none' or 'fdatasync') and optional write-behind delay in seconds
+write_durability = os.environ.get('IDE_WRITE_DURABILITY', 'none')
+write_behind_delay = float(os.environ.get('IDE_WRITE_BEHIND_DELAY', '0')) or None
+ignore_patterns = [p.strip() for p in os.environ.get('IDE_IGNORE_PATTERNS', '').split(',') if p.strip()]
+# Seconds a terminal survives its client disconnecting (0 closes it at once)
+terminal_grace_period = float(os.environ.get('IDE_TERMINAL_GRACE_PERIOD', '300'))
+# Shells kept started per working directory so new terminals open instantly
+terminal_pool_size = int(os.environ.get('IDE_TERMINAL_POOL_SIZE', '2'))
+
+
+def _env_number(name, convert=int):
+    value = os.environ.get(name)
+    return convert(value) if value else None
+
+
+# Optional per-terminal limits; a delegated cgroup v2 directory enables
+# cgroup enforcement, otherwise rlimits and a lower priority are used
+terminal_memory_mb = _env_number('IDE_TERMINAL_MEMORY_MB')
+terminal_limits = ResourceLimits(
+    cpu_percent=_env_number('IDE_TERMINAL_CPU_PERCENT', float),
+    memory_bytes=terminal_memory_mb * 1024 * 1024 if terminal_memory_mb else None,
+    max_pids=_env_number('IDE_TERMINAL_MAX_PIDS'),
+    cgroup_parent=os.environ.get('IDE_TERMINAL_CGROUP')
+)
+
+# Disk operations of all workspaces share one worker thread pool
+io_pool = BlockingIOPool(int(os.environ.get('IDE_IO_THREADS', '8')), float(os.environ.get('IDE_IO_TIMEOUT', '30')))
+
+# API responses are compressed with the best coding the client accepts;
+# large bodies are compressed in the I/O pool's threads
+compressor = None
+if os.environ.get('IDE_COMPRESSION', '1') != '0':
+    compressor = ResponseCompressor(
+        min_size=int(os.environ.get('IDE_COMPRESSION_MIN_SIZE', '1024')),
+        offload=partial(io_pool.run, 'compress')
+    )
+
+# Push file system changes to clients that joined a workspace's file events
+# room. Workspaces are opened per worker, and a client watching one has it
+# open in the worker it is connected to, so each worker sends the changes it
+# sees to its own clients only rather than through the message queue (where
+# every other worker with the workspace open would duplicate them).
+FILE_EVENTS_ROOM = 'file_events'
+file_event_broadcaster = FileEventBroadcaster(socketio, local_only=True)
+
+
+def file_events_room(workspace_id):
+    return f'{FILE_EVENTS_ROOM}:{workspace_id}'
+
+
+def emit_deletion_progress(room, info):
+    socketio.emit('deletion_progress', info, to=room)
+
+
+def create_file_manager(workspace_id, root):
+    """Build the FileManager of a newly opened workspace"""
+    manager = FileManager(
+        workspace_root=root,
+        durability=write_durability,
+        write_behind_delay=write_behind_delay,
+        ignore_patterns=ignore_patterns,
+        io_pool=io_pool
+    )
+    manager.add_tree_listener(file_event_broadcaster.listener(file_events_room(workspace_id)))
+    # Deletions run in the worker that received the request, so every worker reports its own
+    manager.add_job_listener(partial(emit_deletion_progress, file_events_room(workspace_id)))
+    return manager
+
+
+# Each client works in its own workspace (by default the outputs directory),
+# opened on demand and closed again when idle
+workspaces = WorkspaceRegistry(
+    create_file_manager,
+    workspace_path,
+    idle_timeout=float(os.environ.get('IDE_WORKSPACE_IDLE_TIMEOUT', '600')),
+    max_workspaces=int(os.environ.get('IDE_MAX_WORKSPACES', '16'))
+)
+file_manager = workspaces.default.files
 logger.info(f'File manager initialized with workspace: {file_manager.workspace_root}')
 
 # Find ide_backend venv (check if it exists)
@@ -57,7 +150,8 @@ else:
     logger.info(f'No venv found in ide_backend directory: {ide_backend_venv}')
 
 # Initialize terminal manager with workspace root as default working directory
-terminal_manager = TerminalManager(socketio, default_working_dir=workspace_path, default_venv_path=default_venv_path)
+terminal_manager = TerminalManager(socketio, default_working_dir=workspace_path, default_venv_path=default_venv_path,
+                                   pool_size=terminal_pool_size, limits=terminal_limits)
 logger.info(f'Terminal manager initialized with default working directory: {workspace_path}')
 if default_venv_path:
     logger.info(f'Terminal will use venv: {default_venv_path}')
@@ -66,6 +160,24 @@ if default_venv_path:
 active_sessions = {}
 
 
+def request_files():
+    """FileManager of the workspace named by the X-Workspace-Id header or workspace_id parameter"""
+    workspace_id = request.headers.get('X-Workspace-Id') or request.args.get('workspace_id')
+    return workspaces.get(workspace_id).files
+
+
+@app.after_request
+def compress_response(response):
+    if compressor is not None and request.path.startswith('/api/'):
+        compressor.compress_response(response, request.accept_encodings)
+    return response
+
+
+@app.errorhandler(UnknownWorkspace)
+def handle_unknown_workspace(e):
+    return jsonify({'error': 'Unknown workspace; open it with POST /api/workspace'}), 404
+
+
 # ============================================================================
 # REST API Endpoints - File Operations
 # ============================================================================
@@ -77,29 +189,53 @@ def health_check():
         'status': 'ok', 
         'message': 'Backend is running',
         'workspace': file_manager.workspace_root,
-        'workspace_type': 'outputs_directory' if 'outputs' in file_manager.workspace_root else 'project_root'
+        'workspace_type': 'outputs_directory' if 'outputs' in file_manager.workspace_root else 'project_root',
+        'worker': worker_id
     })
 
 
 @app.route('/api/workspace', methods=['GET', 'POST'])
 def workspace():
-    """Get or set workspace directory"""
+    """Get or open a workspace directory.
+
+    POST opens the directory as a workspace of its own (other clients keep
+    theirs) and returns its ``workspace_id``; send it as the X-Workspace-Id
+    header (or ``workspace_id`` parameter) to address that workspace.
+    """
     if request.method == 'GET':
-        return jsonify(file_manager.get_workspace())
+        workspace_id = request.headers.get('X-Workspace-Id') or request.args.get('workspace_id')
+        return jsonify(workspaces.get(workspace_id).info())
     else:
         data = request.json
         workspace_path = data.get('workspace_path')
         if not workspace_path:
             return jsonify({'error': 'workspace_path required'}), 400
-        result = file_manager.set_workspace(workspace_path)
-        return jsonify(result)
+        try:
+            opened = workspaces.open(workspace_path)
+        except ValueError as e:
+            return jsonify({'error': str(e)})
+        # Venvs cached for this folder may have changed since it was last used
+        terminal_manager.venv_resolver.invalidate(opened.root)
+        return jsonify(dict(opened.info(), success=True))
+
+
+@app.route('/api/workspaces/stats', methods=['GET'])
+def workspace_stats():
+    """List open workspaces and open/close counters"""
+    return jsonify(workspaces.stats())
 
 
 @app.route('/api/files/clear-workspace', methods=['POST'])
 def clear_workspace():
-    """Clear all files in the workspace (outputs directory)"""
+    """Clear all files in the workspace (outputs directory)
+
+    Entries are moved to the trash and deleted by a background job (see
+    ``job_id``); ``wait=1`` deletes them before responding instead.
+    """
+    files = request_files()
+    background = request.args.get('wait', '0') != '1'
     try:
-        workspace_root = file_manager.workspace_root
+        workspace_root = files.workspace_root
         
         # Ensure workspace directory exists
         if not os.path.exists(workspace_root):
@@ -107,39 +243,20 @@ def clear_workspace():
             logger.info(f'Created workspace directory: {workspace_root}')
             return jsonify({'success': True, 'message': 'Workspace directory created (was empty)', 'cleared_count': 0}), 200
         
-        items = os.listdir(workspace_root)
-        cleared_count = 0
-        errors = []
-        
-        for item_name in items:
-            # Skip hidden files (including .gitkeep, .git, etc.)
-            if item_name.startswith('.'):
-                continue
-            
-            item_path = os.path.join(workspace_root, item_name)
-            try:
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-                    cleared_count += 1
-                    logger.debug(f'Removed directory: {item_path}')
-                else:
-                    os.remove(item_path)
-                    cleared_count += 1
-                    logger.debug(f'Removed file: {item_path}')
-            except Exception as e:
-                error_msg = f'Error removing {item_name}: {e}'
-                errors.append(error_msg)
-                logger.warning(error_msg)
-        
-        # Ensure directory still exists after clearing
-        os.makedirs(workspace_root, exist_ok=True)
+        # Deleting runs in worker threads so terminals keep streaming meanwhile
+        result = files.clear_workspace(background)
+        cleared_count = result['cleared_count']
+        errors = result['errors']
+        for error_msg in errors:
+            logger.warning(error_msg)
         
         logger.info(f'Cleared workspace: {cleared_count} items removed from {workspace_root}')
         
         response_data = {
             'success': True,
             'message': f'Workspace cleared: {cleared_count} items removed',
-            'cleared_count': cleared_count
+            'cleared_count': cleared_count,
+            'job_id': result['job_id']
         }
         
         if errors:
@@ -153,19 +270,67 @@ def clear_workspace():
 
 @app.route('/api/files/tree', methods=['GET'])
 def get_file_tree():
-    """Get file tree structure"""
+    """Get file tree structure
+
+    Responses for folders in the tree index carry an ETag (and X-Tree-Version
+    header) derived from the index version, the path and max_depth. A
+    matching If-None-Match header, or a ``version`` query parameter equal to
+    the current version, returns 304 Not Modified. Folders outside the index
+    (ignored or symlinked ones) are walked on every request, as changes in
+    them do not bump the version.
+    """
     path = request.args.get('path', '')
     max_depth = int(request.args.get('max_depth', 10))
-    tree = file_manager.get_file_tree(path, max_depth)
-    return jsonify(tree)
+
+    tree_version = request_files().get_tree_version()
+    headers = {
+        'X-Tree-Version': str(tree_version['version']),
+        'X-Tree-Epoch': tree_version['epoch'],
+        'Cache-Control': 'no-cache'
+    }
+
+    if request_files().is_tree_indexed(path):
+        scope = hashlib.sha1(f'{path}\0{max_depth}'.encode('utf-8', errors='surrogatepass')).hexdigest()[:12]
+        etag = f"{tree_version['epoch']}-{tree_version['version']}-{scope}"
+        headers['ETag'] = f'"{etag}"'
+        client_version = request.args.get('version')
+        client_epoch = request.args.get('epoch', tree_version['epoch'])
+        # Compressed responses carry the ETag as a weak one
+        if request.if_none_match.contains_weak(etag) or (
+                client_version == str(tree_version['version']) and client_epoch == tree_version['epoch']):
+            return '', 304, headers
+
+    tree = request_files().get_file_tree(path, max_depth)
+    return packed_response(tree, request.accept_mimetypes), 200, headers
+
+
+@app.route('/api/files/tree/changes', methods=['GET'])
+def get_file_tree_changes():
+    """Get tree entries added, removed or renamed since a version"""
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({'error': 'since required'}), 400
+    epoch = request.args.get('epoch')
+    result = request_files().get_tree_changes(since, epoch)
+    return packed_response(result, request.accept_mimetypes)
 
 
 @app.route('/api/files/list', methods=['GET'])
 def list_files():
-    """List files in a directory"""
+    """List files in a directory
+
+    Query params: path, limit and cursor for pagination, details=1 for size
+    and mtime, hidden=1 to include dot files.
+    """
     path = request.args.get('path', '')
-    result = file_manager.list_files(path)
-    return jsonify(result)
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = min(max(limit, 1), 5000)
+    details = request.args.get('details', '0') == '1'
+    show_hidden = request.args.get('hidden', '0') == '1'
+    result = request_files().list_files(path, cursor, limit, details, show_hidden)
+    return packed_response(result, request.accept_mimetypes)
 
 
 @app.route('/api/files/read', methods=['POST'])
@@ -175,10 +340,70 @@ def read_file():
     file_path = data.get('path')
     if not file_path:
         return jsonify({'error': 'path required'}), 400
-    result = file_manager.read_file(file_path)
+    result = request_files().read_file(file_path)
     return jsonify(result)
 
 
+@app.route('/api/files/cache/stats', methods=['GET'])
+def file_cache_stats():
+    """Get file content cache statistics"""
+    return jsonify(request_files().get_cache_stats())
+
+
+@app.route('/api/files/info', methods=['GET'])
+def file_info():
+    """Get file metadata without reading its content"""
+    file_path = request.args.get('path')
+    if not file_path:
+        return jsonify({'error': 'path required'}), 400
+    result = request_files().get_file_info(file_path)
+    return jsonify(result)
+
+
+@app.route('/api/files/content', methods=['GET'])
+def stream_file():
+    """Stream raw file content, honouring HTTP Range or offset/length params"""
+    file_path = request.args.get('path')
+    if not file_path:
+        return jsonify({'error': 'path required'}), 400
+
+    offset = request.args.get('offset', type=int)
+    length = request.args.get('length', type=int)
+    is_partial = offset is not None or length is not None
+
+    files = request_files()
+    file_range = files.open_file_range(file_path)
+    if 'error' in file_range:
+        return jsonify(file_range), 404
+    size = file_range['size']
+
+    if not is_partial and request.range is not None:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            return '', 416, {'Content-Range': f'bytes */{size}'}
+        offset, stop = byte_range
+        length = stop - offset
+        is_partial = True
+
+    if is_partial:
+        file_range = files.open_file_range(file_path, offset or 0, length)
+        if 'error' in file_range:
+            return jsonify(file_range), 416, {'Content-Range': f'bytes */{size}'}
+
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Content-Length': str(file_range['length'])
+    }
+    status = 200
+    if is_partial and file_range['length'] > 0:
+        status = 206
+        last = file_range['offset'] + file_range['length'] - 1
+        headers['Content-Range'] = f"bytes {file_range['offset']}-{last}/{size}"
+
+    body = files.iter_file_range(file_range['abs_path'], file_range['offset'], file_range['length'])
+    return Response(body, status=status, mimetype=file_range['mime'], headers=headers, direct_passthrough=True)
+
+
 @app.route('/api/files/write', methods=['POST'])
 def write_file():
     """Write file content"""
@@ -187,10 +412,58 @@ def write_file():
     content = data.get('content', '')
     if not file_path:
         return jsonify({'error': 'path required'}), 400
-    result = file_manager.write_file(file_path, content)
+    result = request_files().write_file(file_path, content)
+    return jsonify(result)
+
+
+@app.route('/api/files/patch', methods=['POST'])
+def patch_file():
+    """Apply edits or a unified diff to a file, checked against a base hash"""
+    data = request.json
+    file_path = data.get('path')
+    base_hash = data.get('base_hash')
+    edits = data.get('edits')
+    diff = data.get('diff')
+    if not file_path or not base_hash:
+        return jsonify({'error': 'path and base_hash required'}), 400
+    if edits is None and diff is None:
+        return jsonify({'error': 'edits or diff required'}), 400
+    result = request_files().patch_file(file_path, base_hash, edits=edits, diff=diff)
+    if result.get('invalid'):
+        return jsonify(result), 400
+    if result.get('conflict'):
+        return jsonify(result), 409
+    return jsonify(result)
+
+
+@app.route('/api/files/flush', methods=['POST'])
+def flush_writes():
+    """Write out saves queued by write-behind (one file or all)"""
+    data = request.get_json(silent=True) or {}
+    result = request_files().flush_writes(data.get('path'))
     return jsonify(result)
 
 
+@app.route('/api/files/write/stats', methods=['GET'])
+def write_stats():
+    """Get write durability mode and write-behind counters"""
+    return jsonify(request_files().get_write_stats())
+
+
+@app.route('/api/files/encoding/stats', methods=['GET'])
+def get_encoding_stats():
+    """Get response compression counters per content coding"""
+    if compressor is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(compressor.stats(), enabled=True))
+
+
+@app.route('/api/files/io/stats', methods=['GET'])
+def io_stats():
+    """Get worker thread pool counters for blocking disk operations"""
+    return jsonify(io_pool.stats())
+
+
 @app.route('/api/files/create', methods=['POST'])
 def create_file():
     """Create a new file"""
@@ -199,7 +472,7 @@ def create_file():
     content = data.get('content', '')
     if not file_path:
         return jsonify({'error': 'path required'}), 400
-    result = file_manager.create_file(file_path, content)
+    result = request_files().create_file(file_path, content)
     return jsonify(result)
 
 
@@ -210,7 +483,7 @@ def create_folder():
     folder_path = data.get('path')
     if not folder_path:
         return jsonify({'error': 'path required'}), 400
-    result = file_manager.create_folder(folder_path)
+    result = request_files().create_folder(folder_path)
     return jsonify(result)
 
 
@@ -226,18 +499,48 @@ def delete_file():
     file_path = data.get('path')
     if not file_path:
         return jsonify({'error': 'path required'}), 400
-    result = file_manager.delete_file(file_path)
+    result = request_files().delete_file(file_path)
     return jsonify(result)
 
 
 @app.route('/api/files/delete-folder', methods=['POST'])
 def delete_folder():
-    """Delete a folder"""
+    """Delete a folder (in the background unless ``wait`` is true)"""
     data = request.json
     folder_path = data.get('path')
     if not folder_path:
         return jsonify({'error': 'path required'}), 400
-    result = file_manager.delete_folder(folder_path)
+    result = request_files().delete_folder(folder_path, background=not data.get('wait'))
+    return jsonify(result)
+
+
+@app.route('/api/files/jobs', methods=['GET'])
+def get_deletion_jobs():
+    """List recent background deletions"""
+    return jsonify(request_files().get_deletion_stats())
+
+
+@app.route('/api/files/jobs/<job_id>', methods=['GET'])
+def get_deletion_job(job_id):
+    """Get the state and progress of a background deletion"""
+    result = request_files().get_deletion_job(job_id)
+    if 'error' in result:
+        return jsonify(result), 404
+    return jsonify(result)
+
+
+@app.route('/api/files/batch', methods=['POST'])
+def batch_files():
+    """Run several file operations in one request"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON object body required'}), 400
+    operations = data.get('operations')
+    if operations is None:
+        return jsonify({'error': 'operations required'}), 400
+    result = request_files().batch(operations, transactional=bool(data.get('transactional')))
+    if 'error' in result:
+        return jsonify(result), 400
     return jsonify(result)
 
 
@@ -249,10 +552,73 @@ def rename_file():
     new_name = data.get('new_name')
     if not old_path or not new_name:
         return jsonify({'error': 'old_path and new_name required'}), 400
-    result = file_manager.rename(old_path, new_name)
+    result = request_files().rename(old_path, new_name)
     return jsonify(result)
 
 
+@app.route('/api/search', methods=['GET'])
+def search_files():
+    """Search file contents in the workspace
+
+    Query params: q, regex (0/1), case (0/1 for case-sensitive), offset and
+    limit for pagination, or stream=1 for newline-delimited JSON matches.
+    """
+    query = request.args.get('q', '')
+    if not query:
+        return jsonify({'error': 'q required'}), 400
+    regex = request.args.get('regex', '0') == '1'
+    case_sensitive = request.args.get('case', '0') == '1'
+
+    files = request_files()
+    if request.args.get('stream') == '1':
+        if regex:
+            try:
+                re.compile(query)
+            except re.error as e:
+                return jsonify({'error': f'Invalid regex: {e}'}), 400
+
+        def generate():
+            for match in files.iter_search(query, regex, case_sensitive):
+                yield json.dumps(match) + '\n'
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    result = files.search(query, regex, case_sensitive, offset, limit)
+    if 'error' in result:
+        return jsonify(result), 400
+    return jsonify(result)
+
+
+@app.route('/api/files/find', methods=['GET'])
+def find_files():
+    """Fuzzy-find files by path for quick open
+
+    Query params: q, limit (default 50)
+    """
+    query = request.args.get('q', '')
+    if not query:
+        return jsonify({'error': 'q required'}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify(request_files().find_files(query, limit))
+
+
+@app.route('/api/search/stats', methods=['GET'])
+def search_stats():
+    """Get search index statistics"""
+    return jsonify(request_files().get_search_stats())
+
+
+@app.route('/api/terminals/stats', methods=['GET'])
+def terminal_stats():
+    """Get per-terminal I/O counters and process usage"""
+    try:
+        return jsonify(terminal_manager.get_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ============================================================================
 # WebSocket Events - Terminal Operations
 # ============================================================================
@@ -268,13 +634,43 @@ def handle_connect():
 def handle_disconnect():
     """Handle client disconnection"""
     logger.info(f'Client disconnected: {request.sid}')
-    # Clean up sessions for this client
+    workspaces.unbind(request.sid)
+    # Keep this client's sessions alive for a while so it can reattach
     sessions_to_remove = [sid for sid, data in active_sessions.items() if data.get('client_sid') == request.sid]
     for session_id in sessions_to_remove:
+        if terminal_grace_period > 0 and terminal_manager.detach_session(
+                session_id, terminal_grace_period, partial(active_sessions.pop, session_id, None)):
+            active_sessions[session_id]['client_sid'] = None
+            continue
         terminal_manager.close_session(session_id)
         active_sessions.pop(session_id, None)
 
 
+@socketio.on('watch_files')
+def handle_watch_files(data=None):
+    """Subscribe the client to fs_changed events for its workspace (``workspace_id``, default if omitted)"""
+    try:
+        watched, previous = workspaces.bind(request.sid, (data or {}).get('workspace_id'))
+    except UnknownWorkspace:
+        emit('files_watch_failed', {'error': 'Unknown workspace'})
+        return
+    # A client watches one workspace at a time and keeps it open meanwhile
+    if previous is not None and previous is not watched:
+        leave_room(file_events_room(previous.id))
+    join_room(file_events_room(watched.id))
+    tree_version = watched.files.get_tree_version()
+    emit('files_watched', dict(tree_version, workspace_id=watched.id))
+    logger.info(f'Client {request.sid} watching workspace files in {watched.root}')
+
+
+@socketio.on('unwatch_files')
+def handle_unwatch_files(data=None):
+    """Unsubscribe the client from fs_changed events"""
+    watched = workspaces.unbind(request.sid)
+    if watched is not None:
+        leave_room(file_events_room(watched.id))
+
+
 @socketio.on('create_terminal')
 def handle_create_terminal(data):
     """Create a new terminal session"""
@@ -285,8 +681,8 @@ def handle_create_terminal(data):
         if requested_working_dir and requested_working_dir.strip() and requested_working_dir.strip() != '/' and os.path.exists(requested_working_dir):
             working_dir = requested_working_dir
         else:
-            # Default to the workspace root (outputs directory)
-            working_dir = file_manager.workspace_root
+            # Default to the root of the client's workspace (outputs directory)
+            working_dir = workspaces.get(data.get('workspace_id')).root
             logger.info(f'Using workspace root as terminal working directory: {working_dir}')
         
         session_id = data.get('session_id')
@@ -299,7 +695,11 @@ def handle_create_terminal(data):
         join_room(client_sid)
         logger.info(f'Client {client_sid} joined room {client_sid}')
 
-        session_id = terminal_manager.create_session(session_id, working_dir, client_sid)
+        # Clients that acknowledge terminal_output messages get backpressure
+        flow_control = bool(data.get('flow_control'))
+        # Binary sessions get terminal_output as raw bytes (binary frames)
+        binary = bool(data.get('binary'))
+        session_id = terminal_manager.create_session(session_id, working_dir, client_sid, flow_control, binary)
 
         if session_id:
             active_sessions[session_id] = {
@@ -308,7 +708,8 @@ def handle_create_terminal(data):
             }
             emit('terminal_created', {
                 'session_id': session_id,
-                'status': 'success'
+                'status': 'success',
+                'reattach_token': terminal_manager.get_session(session_id).reattach_token
             })
             logger.info(f'Terminal session created: {session_id} for client {client_sid}')
         else:
@@ -322,6 +723,39 @@ def handle_create_terminal(data):
         emit('terminal_error', {'error': str(e)})
 
 
+@socketio.on('reattach_terminal')
+def handle_reattach_terminal(data):
+    """Rebind a running terminal session to this client and replay its scrollback"""
+    try:
+        session_id = data.get('session_id')
+        token = data.get('reattach_token')
+        if not session_id or not token:
+            emit('terminal_error', {'error': 'session_id and reattach_token required'})
+            return
+
+        join_room(request.sid)
+        binary = bool(data.get('binary'))
+        replay = terminal_manager.reattach_session(
+            session_id, token, request.sid, bool(data.get('flow_control')), binary)
+        if replay is None:
+            emit('terminal_reattach_failed', {
+                'session_id': session_id,
+                'error': 'Session not found or token invalid'
+            })
+            return
+
+        active_sessions.setdefault(session_id, {})['client_sid'] = request.sid
+        emit('terminal_reattached', {
+            'session_id': session_id,
+            'data': replay if binary else replay.decode('utf-8', errors='replace')
+        })
+        logger.info(f'Terminal session {session_id} reattached to client {request.sid}')
+
+    except Exception as e:
+        logger.error(f'Error reattaching terminal: {e}')
+        emit('terminal_error', {'error': str(e)})
+
+
 @socketio.on('terminal_input')
 def handle_terminal_input(data):
     """Handle input to terminal"""
@@ -329,7 +763,7 @@ def handle_terminal_input(data):
         session_id = data.get('session_id')
         input_data = data.get('data', '')
 
-        logger.info(f'Received terminal input for session {session_id}: {repr(input_data)}')
+        logger.debug(f'Received {len(input_data)} chars of terminal input for session {session_id}')
 
         if not session_id:
             emit('terminal_error', {'error': 'session_id required'})
@@ -343,8 +777,6 @@ def handle_terminal_input(data):
                 'error': 'Invalid session or session not found',
                 'session_id': session_id
             })
-        else:
-            logger.info(f'Successfully sent input to session {session_id}')
 
     except Exception as e:
         logger.error(f'Error handling terminal input: {e}')
@@ -419,6 +851,10 @@ def serve_frontend(path):
 
 if __name__ == '__main__':
     import socket
+    import atexit
+
+    # Don't lose saves still waiting in the write-behind queue
+    atexit.register(workspaces.close_all)
     
     # Get network IP addresses
     def get_network_ips():
@@ -0,0 +1,111 @@
+"""Benchmark file API response encodings on a synthetic workspace.
+
+    python bench_responses.py [--files 50000] [--per-folder 100] [--repeat 5]
+
+Builds a temporary workspace of source-like files, then reports the size
+and encode time of the tree and a large folder listing as JSON (sorted
+keys, as Flask's jsonify does by default, and unsorted), as MessagePack,
+and compressed with each available content coding.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+from file_manager import FileManager
+from response_encoding import available_codecs, msgpack
+
+FOLDERS_PER_PACKAGE = 10
+WORDS = ('user', 'account', 'session', 'order', 'invoice', 'cart', 'search', 'profile', 'report',
+         'widget', 'table', 'chart', 'form', 'modal', 'list', 'item', 'detail', 'filter', 'token',
+         'upload', 'export', 'config', 'router', 'store', 'cache', 'client', 'service', 'helper')
+SUFFIXES = ('.py', '.ts', '.tsx', '.js', '.css', '.json', '.md', '_test.py', '.spec.ts')
+
+
+def build_workspace(root, files, per_folder):
+    """Create ``files`` empty files with varied names in src/pkgN/modM folders"""
+    rng = random.Random(0)
+    created = 0
+    package = 0
+    while created < files:
+        for module in range(FOLDERS_PER_PACKAGE):
+            folder = os.path.join(root, 'src', f'pkg{package:03d}', f'mod{module:02d}')
+            os.makedirs(folder, exist_ok=True)
+            for index in range(min(per_folder, files - created)):
+                name = '_'.join(rng.sample(WORDS, 2)) + f'_{index}' + rng.choice(SUFFIXES)
+                open(os.path.join(folder, name), 'w').close()
+                created += 1
+            if created >= files:
+                break
+        package += 1
+    # One flat folder for the listing benchmark
+    listing = os.path.join(root, 'assets')
+    os.makedirs(listing)
+    for index in range(5000):
+        open(os.path.join(listing, f'{rng.choice(WORDS)}-{rng.choice(WORDS)}-{index}.svg'), 'w').close()
+
+
+def timed(func, repeat):
+    """Best-of-``repeat`` seconds and the last result"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(name, payload, repeat):
+    print(f'\n{name}')
+    print(f"  {'encoding':<24}{'bytes':>12}{'ms':>10}")
+    rows = [
+        ('json (sorted keys)', lambda: json.dumps(payload, separators=(',', ':'), sort_keys=True).encode()),
+        ('json', lambda: json.dumps(payload, separators=(',', ':')).encode())
+    ]
+    if msgpack is not None:
+        rows.append(('msgpack', lambda: msgpack.packb(payload, use_bin_type=True)))
+    else:
+        print('  (msgpack not installed)')
+
+    for label, encode in rows:
+        seconds, body = timed(encode, repeat)
+        print(f'  {label:<24}{len(body):>12,}{seconds * 1000:>10.1f}')
+        if label == 'json (sorted keys)':
+            continue
+        for coding, codec in available_codecs().items():
+            seconds, compressed = timed(lambda: codec(body), repeat)
+            print(f'  {"  + " + coding:<24}{len(compressed):>12,}{seconds * 1000:>10.1f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark file API response encodings')
+    parser.add_argument('--files', type=int, default=50000)
+    parser.add_argument('--per-folder', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='ide-bench-')
+    try:
+        started = time.perf_counter()
+        build_workspace(root, args.files, args.per_folder)
+        print(f'Created {args.files:,} files in {time.perf_counter() - started:.1f}s under {root}')
+
+        manager = FileManager(workspace_root=root, watch=False)
+        try:
+            tree = manager.get_file_tree('', 10)
+            report(f'GET /api/files/tree ({args.files:,} files)', tree, args.repeat)
+            listing = manager.list_files('assets', None, 5000, True, False)
+            report('GET /api/files/list?path=assets&limit=5000&details=1', listing, args.repeat)
+        finally:
+            manager.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
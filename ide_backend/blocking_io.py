@@ -0,0 +1,99 @@
+import time
+import logging
+import eventlet
+from eventlet import tpool
+from eventlet.semaphore import Semaphore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IO_THREADS = 8
+# Seconds a request waits for a disk operation before giving up on it
+DEFAULT_IO_TIMEOUT = 30.0
+
+
+class BlockingIOTimeout(TimeoutError):
+    """A disk operation did not finish within its timeout"""
+
+
+class BlockingIOPool:
+    """Runs blocking disk operations in native threads, off the eventlet hub.
+
+    Operations go through eventlet's ``tpool``; at most ``max_workers`` run
+    at once and the rest wait in line, so a burst of large deletes cannot
+    take every thread. A caller stops waiting after ``timeout`` seconds and
+    gets BlockingIOTimeout, but the operation itself cannot be interrupted
+    and keeps its slot until it finishes. Functions run here must only do
+    plain I/O: no eventlet calls, Socket.IO emits or shared-index updates.
+    """
+
+    def __init__(self, max_workers=DEFAULT_IO_THREADS, timeout=DEFAULT_IO_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        if not tpool._setup_already:
+            tpool.set_num_threads(max_workers)
+        self._slots = Semaphore(max_workers)
+        self.queued = 0
+        self.active = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.run_time = 0.0
+        self._ops = {}  # operation name -> [count, total seconds]
+
+    def _execute(self, name, func, args, kwargs):
+        queued_at = time.monotonic()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        with self._slots:
+            self.queued -= 1
+            self.active += 1
+            started = time.monotonic()
+            self.wait_time += started - queued_at
+            try:
+                result = tpool.execute(func, *args, **kwargs)
+                self.completed += 1
+                return result
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.active -= 1
+                elapsed = time.monotonic() - started
+                self.run_time += elapsed
+                op = self._ops.setdefault(name, [0, 0.0])
+                op[0] += 1
+                op[1] += elapsed
+
+    def run(self, name, func, *args, timeout=None, **kwargs):
+        """Run ``func(*args, **kwargs)`` in a worker thread and return its result"""
+        timeout = self.timeout if timeout is None else timeout
+        thread = eventlet.spawn(self._execute, name, func, args, kwargs)
+        timer = eventlet.Timeout(timeout)
+        try:
+            return thread.wait()
+        except eventlet.Timeout as e:
+            if e is not timer:
+                raise
+            self.timeouts += 1
+            logger.warning(f'{name} did not finish within {timeout}s; it keeps running in the background')
+            raise BlockingIOTimeout(f'{name} timed out after {timeout}s')
+        finally:
+            timer.cancel()
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'timeout': self.timeout,
+            'queued': self.queued,
+            'active': self.active,
+            'max_queued': self.max_queued,
+            'completed': self.completed,
+            'failed': self.failed,
+            'timeouts': self.timeouts,
+            'wait_time': round(self.wait_time, 3),
+            'run_time': round(self.run_time, 3),
+            'operations': {name: {'count': count, 'time': round(total, 3)}
+                           for name, (count, total) in self._ops.items()}
+        }
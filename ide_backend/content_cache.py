@@ -0,0 +1,91 @@
+import os
+from collections import OrderedDict
+
+# Default byte budget for cached file contents
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ContentCache:
+    """Bounded LRU cache of decoded file contents.
+
+    Entries are keyed by absolute path and validated against the file's
+    stat signature (mtime, size, inode), so a file changed behind our back
+    is never served stale. The file watcher also invalidates entries
+    directly, which covers writes within the same mtime tick.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # abs_path -> (signature, content, cost)
+
+    @staticmethod
+    def signature(stat):
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def get(self, abs_path, stat):
+        """Return cached content if the file is unchanged, else None"""
+        entry = self._entries.get(abs_path)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != self.signature(stat):
+            self._remove(abs_path)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(abs_path)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, abs_path, stat, content):
+        """Cache content for a file, evicting least recently used entries"""
+        # Cost is the on-disk size, which bounds the decoded text size
+        cost = max(stat.st_size, 1)
+        if cost > self.max_bytes // 4:
+            return
+        self._remove(abs_path)
+        self._entries[abs_path] = (self.signature(stat), content, cost)
+        self.current_bytes += cost
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, _, evicted_cost) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_cost
+            self.evictions += 1
+
+    def _remove(self, abs_path):
+        entry = self._entries.pop(abs_path, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+        return entry is not None
+
+    def invalidate(self, abs_path, folder=False):
+        """Drop a file, or everything below a folder, from the cache"""
+        if self._remove(abs_path):
+            self.invalidations += 1
+        if not folder:
+            return
+        prefix = abs_path.rstrip(os.sep) + os.sep
+        for path in [p for p in self._entries if p.startswith(prefix)]:
+            self._remove(path)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
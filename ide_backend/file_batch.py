@@ -0,0 +1,167 @@
+import os
+import uuid
+import shutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_OPERATIONS = ('create', 'write', 'delete', 'rename', 'mkdir')
+
+
+class BatchTransaction:
+    """Runs a list of file operations with rollback on failure.
+
+    Files that are overwritten or deleted are moved into a hidden staging
+    folder in the workspace (a cheap rename on the same file system), so
+    undoing them is a rename back. Every successful operation pushes an
+    undo step; ``rollback`` replays them in reverse order and ``commit``
+    discards the staging folder.
+    """
+
+    def __init__(self, file_manager, transactional=True):
+        self.fm = file_manager
+        self.transactional = transactional
+        self._undo = []
+        self._staging = None
+
+    def _stage_path(self, abs_path):
+        if self._staging is None:
+            self._staging = os.path.join(self.fm.workspace_root, f'.ide-batch-{uuid.uuid4().hex[:12]}')
+            os.makedirs(self._staging)
+        return os.path.join(self._staging, f'{len(self._undo)}-{os.path.basename(abs_path)}')
+
+    def _stash(self, abs_path):
+        """Move an existing file or folder out of the way, undoably; returns where it went"""
+        self.fm._flush_pending(abs_path, folder=True)
+        staged = self._stage_path(abs_path)
+        os.replace(abs_path, staged)
+        self.fm._forget(abs_path)
+        self._undo.append(('restore', staged, abs_path))
+        return staged
+
+    def _track_created(self, abs_path):
+        """Remember the topmost folder/file a create or mkdir brings into existence"""
+        top = None
+        current = abs_path
+        while not os.path.exists(current):
+            top = current
+            current = os.path.dirname(current)
+        if top:
+            self._undo.append(('remove', top, None))
+
+    def run(self, operations):
+        results = []
+        failed = False
+        for index, operation in enumerate(operations):
+            if failed and self.transactional:
+                results.append({'index': index, 'skipped': True})
+                continue
+            result = self._run_one(operation)
+            result['index'] = index
+            results.append(result)
+            if 'error' in result:
+                failed = True
+
+        rolled_back = False
+        if failed and self.transactional:
+            self.rollback()
+            rolled_back = True
+        else:
+            self.commit()
+
+        return {
+            'success': not failed,
+            'results': results,
+            'rolled_back': rolled_back
+        }
+
+    def _run_one(self, operation):
+        op = operation.get('op')
+        path = operation.get('path')
+        if op not in BATCH_OPERATIONS:
+            return {'op': op, 'error': f'Unknown operation: {op}'}
+        if not path:
+            return {'op': op, 'error': 'path required'}
+
+        try:
+            abs_path = self.fm._get_safe_path(path)
+            if op == 'mkdir':
+                if os.path.exists(abs_path):
+                    return {'op': op, 'path': path, 'error': 'Folder already exists'}
+                self._track_created(abs_path)
+                result = self.fm.create_folder(path)
+            elif op == 'create':
+                if os.path.exists(abs_path):
+                    return {'op': op, 'path': path, 'error': 'File already exists'}
+                self._track_created(abs_path)
+                result = self.fm.create_file(path, operation.get('content', ''))
+            elif op == 'write':
+                if os.path.isdir(abs_path):
+                    return {'op': op, 'path': path, 'error': 'Path is a folder'}
+                staged = None
+                if self.transactional and os.path.exists(abs_path):
+                    staged = self._stash(abs_path)
+                else:
+                    self._track_created(abs_path)
+                os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+                # Bypass write-behind so the result is on disk before we commit
+                self.fm._write_to_disk(abs_path, operation.get('content', ''))
+                if staged:
+                    # The new file replaces the stashed one, mode bits included
+                    shutil.copymode(staged, abs_path)
+                result = {'success': True, 'path': path}
+            elif op == 'delete':
+                if not os.path.lexists(abs_path):
+                    return {'op': op, 'path': path, 'error': 'Path does not exist'}
+                if self.transactional:
+                    self._stash(abs_path)
+                    result = {'success': True}
+                elif os.path.isdir(abs_path):
+                    result = self.fm.delete_folder(path)
+                else:
+                    result = self.fm.delete_file(path)
+            else:
+                new_name = operation.get('new_name')
+                if not new_name:
+                    return {'op': op, 'path': path, 'error': 'new_name required'}
+                result = self.fm.rename(path, new_name)
+                if 'error' not in result:
+                    self._undo.append(('move', self.fm._get_safe_path(result['new_path']), abs_path))
+        except Exception as e:
+            result = {'error': str(e)}
+
+        if 'error' in result and self._undo and self._undo[-1][0] == 'remove' \
+                and not os.path.exists(self._undo[-1][1]):
+            # Nothing was created after all
+            self._undo.pop()
+        result['op'] = op
+        result.setdefault('path', path)
+        return result
+
+    def rollback(self):
+        """Undo every completed operation, most recent first"""
+        while self._undo:
+            action, first, second = self._undo.pop()
+            try:
+                if action == 'restore':
+                    if os.path.lexists(second):
+                        self.fm._remove(second)
+                    os.replace(first, second)
+                    self.fm._forget(second)
+                elif action == 'remove':
+                    self.fm._flush_pending(first, folder=True)
+                    if os.path.lexists(first):
+                        self.fm._remove(first)
+                    self.fm._forget(first)
+                elif action == 'move':
+                    self.fm._move(first, second)
+            except Exception as e:
+                logger.error(f'Batch rollback step {action} failed for {first}: {e}')
+        self.commit()
+
+    def commit(self):
+        """Discard backups of overwritten and deleted entries"""
+        self._undo = []
+        if self._staging:
+            self.fm.io.run('rmtree', shutil.rmtree, self._staging, True)
+            self._staging = None
@@ -0,0 +1,609 @@
+import os
+import ctypes
+import ctypes.util
+import struct
+import uuid
+import logging
+from collections import deque
+import eventlet
+from eventlet.green import select
+from ignore_rules import IgnoreMatcher, IGNORE_FILE_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Same limits the recursive walk has always applied per directory
+MAX_DIR_ENTRIES = 500
+MAX_LISTED_ENTRIES = 200
+
+# Number of tree changes remembered for /api/files/tree/changes
+CHANGE_LOG_SIZE = 10000
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Watches directories for changes using Linux inotify"""
+
+    MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO |
+            IN_DELETE_SELF | IN_MOVE_SELF | IN_CLOSE_WRITE | IN_ONLYDIR)
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError('libc not found')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('inotify not supported on this platform')
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._wd_to_dir = {}
+        self._dir_to_wd = {}
+
+    def fileno(self):
+        return self.fd
+
+    def add(self, rel_dir, abs_dir):
+        """Start watching a directory"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(abs_dir), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), abs_dir)
+        self._wd_to_dir[wd] = rel_dir
+        self._dir_to_wd[rel_dir] = wd
+
+    def remove(self, rel_dir):
+        """Stop watching a directory"""
+        wd = self._dir_to_wd.pop(rel_dir, None)
+        if wd is None:
+            return
+        self._wd_to_dir.pop(wd, None)
+        # Fails harmlessly if the kernel already dropped the watch
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Return pending (rel_dir, name, mask, cookie) events without blocking"""
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buf):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, None, mask, 0))
+                continue
+            rel_dir = self._wd_to_dir.get(wd)
+            if mask & IN_IGNORED:
+                self._wd_to_dir.pop(wd, None)
+                if rel_dir is not None and self._dir_to_wd.get(rel_dir) == wd:
+                    self._dir_to_wd.pop(rel_dir, None)
+                continue
+            if rel_dir is not None:
+                events.append((rel_dir, name, mask, cookie))
+        return events
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+        self._wd_to_dir.clear()
+        self._dir_to_wd.clear()
+
+
+class PollingWatcher:
+    """Fallback watcher that detects changed directories by their mtime"""
+
+    def __init__(self):
+        self._mtimes = {}
+        self._paths = {}
+
+    def fileno(self):
+        return None
+
+    def add(self, rel_dir, abs_dir):
+        self._paths[rel_dir] = abs_dir
+        self._mtimes[rel_dir] = self._mtime(abs_dir)
+
+    def remove(self, rel_dir):
+        self._paths.pop(rel_dir, None)
+        self._mtimes.pop(rel_dir, None)
+
+    def _mtime(self, abs_dir):
+        try:
+            return os.stat(abs_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def read_events(self):
+        events = []
+        for rel_dir, abs_dir in list(self._paths.items()):
+            mtime = self._mtime(abs_dir)
+            if mtime != self._mtimes.get(rel_dir):
+                self._mtimes[rel_dir] = mtime
+                events.append((rel_dir, None, 0, 0))
+        return events
+
+    def close(self):
+        self._paths.clear()
+        self._mtimes.clear()
+
+
+class FileTreeIndex:
+    """In-memory index of a workspace directory tree.
+
+    The index is built once and then kept current by a watcher (inotify on
+    Linux, mtime polling elsewhere). Only directories reported as changed
+    are rescanned, and ``version`` is bumped whenever the tree changes.
+    Each change is also kept in a bounded log so clients can ask for the
+    entries added, removed or renamed since a version they already have,
+    and is passed to listeners registered with ``add_listener`` together
+    with files reported as modified. Entries matched by the ignore rules
+    (built-in defaults, ``.gitignore`` and ``.ideignore``) are left out of
+    the tree and ignored folders are never descended into.
+    """
+
+    def __init__(self, root, use_inotify=True, poll_interval=1.0, coalesce_delay=0.02, ignore_patterns=()):
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.ignore = IgnoreMatcher(self.root, extra_patterns=ignore_patterns)
+        self.poll_interval = poll_interval
+        self.coalesce_delay = coalesce_delay
+        self.version = 0
+        # Identifies this index instance, so versions from a previous
+        # workspace or server process are never mistaken for ours
+        self.epoch = uuid.uuid4().hex[:12]
+        self._dirs = {}  # rel_dir -> {name: is_dir}
+        self._hidden = {}  # rel_dir -> names ignored in that directory
+        self._links = {}  # rel_dir -> names of symlinks in that directory
+        self._ignore_changed = set()
+        self._dirty = set()
+        self._render_cache = {}
+        self._pending_changes = []
+        self._moves = {}  # inotify cookie -> source path of a rename
+        self._renames = {}  # old path -> new path, applied on next sync
+        self._dropped = {}  # removed folder -> entries it contained
+        self._modified = set()
+        self._listeners = []
+        self._change_log = deque()
+        self._truncated_version = 0
+        self._thread = None
+        self._running = False
+        self._watcher = self._create_watcher(use_inotify)
+        self._scan_tree('')
+
+    def _create_watcher(self, use_inotify):
+        if use_inotify:
+            try:
+                return InotifyWatcher()
+            except (OSError, AttributeError) as e:
+                logger.info(f'inotify unavailable, polling for file changes: {e}')
+        return PollingWatcher()
+
+    def _fallback_to_polling(self, reason):
+        """Switch to the polling watcher, e.g. when inotify watches run out"""
+        logger.warning(f'Falling back to polling file watcher: {reason}')
+        self._watcher.close()
+        self._watcher = PollingWatcher()
+        for rel_dir in self._dirs:
+            self._watcher.add(rel_dir, self._abs(rel_dir))
+
+    def _abs(self, rel_dir):
+        return os.path.join(self.root, rel_dir) if rel_dir else self.root
+
+    def _watch(self, rel_dir):
+        try:
+            self._watcher.add(rel_dir, self._abs(rel_dir))
+        except OSError as e:
+            if isinstance(self._watcher, InotifyWatcher):
+                self._fallback_to_polling(e)
+
+    def _list_dir(self, rel_dir):
+        """Return ({name: is_dir}, symlink names) for a directory, or (None, None) if it is gone"""
+        entries = {}
+        links = set()
+        try:
+            with os.scandir(self._abs(rel_dir)) as it:
+                for entry in it:
+                    try:
+                        entries[entry.name] = entry.is_dir()
+                        if entry.is_symlink():
+                            links.add(entry.name)
+                    except OSError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError):
+            return None, None
+        except PermissionError:
+            return {}, frozenset()
+        return entries, frozenset(links)
+
+    def _set_listing(self, rel_dir, entries, links):
+        """Store a directory listing along with the names it ignores"""
+        self.ignore.load_dir(rel_dir, entries)
+        self._dirs[rel_dir] = entries
+        self._links[rel_dir] = links
+        self._hidden[rel_dir] = frozenset(
+            name for name, is_dir in entries.items()
+            if self.ignore.is_ignored(os.path.join(rel_dir, name) if rel_dir else name, is_dir)
+        )
+
+    def _is_hidden(self, rel_dir, name):
+        return name in self._hidden.get(rel_dir, ())
+
+    def _should_descend(self, rel_dir, name):
+        if self._is_hidden(rel_dir, name):
+            return False
+        # Symlinked directories are listed but not indexed, to avoid cycles
+        return not os.path.islink(os.path.join(self._abs(rel_dir), name))
+
+    def _scan_tree(self, rel_dir, record=False):
+        """Index a directory and everything below it"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            entries, links = self._list_dir(current)
+            if entries is None:
+                continue
+            self._set_listing(current, entries, links)
+            self._watch(current)
+            for name, is_dir in entries.items():
+                child = os.path.join(current, name) if current else name
+                if record and not self._is_hidden(current, name):
+                    self._record('added', child, is_dir)
+                if is_dir and self._should_descend(current, name):
+                    stack.append(child)
+
+    def _record(self, action, rel_path, is_dir):
+        self._pending_changes.append({
+            'action': action,
+            'path': rel_path,
+            'type': 'folder' if is_dir else 'file'
+        })
+
+    def _drop_tree(self, rel_dir):
+        """Forget a directory and everything below it"""
+        prefix = rel_dir + os.sep if rel_dir else ''
+        for key in [k for k in self._dirs if k == rel_dir or k.startswith(prefix)]:
+            del self._dirs[key]
+            self._hidden.pop(key, None)
+            self._links.pop(key, None)
+            self._watcher.remove(key)
+
+    def _rescan(self, rel_dir):
+        """Refresh one directory, returning True if anything changed"""
+        old = self._dirs.get(rel_dir)
+        if old is None:
+            return False
+        new, links = self._list_dir(rel_dir)
+        if new is None:
+            self._drop_tree(rel_dir)
+            return True
+        old_links = self._links.get(rel_dir, frozenset())
+        if new == old and links == old_links:
+            return False
+        # is_dir() follows symlinks, so a folder replaced by a symlink to
+        # one only shows up as a change in symlink status
+        relinked = old_links ^ links
+
+        if any(old.get(name) != new.get(name) for name in IGNORE_FILE_NAMES):
+            self._ignore_changed.add(rel_dir)
+        old_hidden = self._hidden.get(rel_dir, frozenset())
+        self._set_listing(rel_dir, new, links)
+        # Remove stale subtrees before adding new ones so that a moved
+        # directory gets a fresh watch for its new location
+        for name, was_dir in old.items():
+            if name in new and new[name] == was_dir and name not in relinked:
+                continue
+            child = os.path.join(rel_dir, name) if rel_dir else name
+            if name not in old_hidden:
+                self._record('removed', child, was_dir)
+            if was_dir:
+                if child in self._renames:
+                    self._dropped[child] = self._subtree_entries(child)
+                self._drop_tree(child)
+        for name, is_dir in new.items():
+            if name in old and old[name] == is_dir and name not in relinked:
+                continue
+            child = os.path.join(rel_dir, name) if rel_dir else name
+            if not self._is_hidden(rel_dir, name):
+                self._record('added', child, is_dir)
+            if is_dir and self._should_descend(rel_dir, name):
+                self._scan_tree(child, record=True)
+        return True
+
+    def _subtree_entries(self, rel_dir):
+        """Return {(path relative to rel_dir, is_dir)} for an indexed folder"""
+        entries = set()
+        prefix = rel_dir + os.sep if rel_dir else ''
+        for key, listing in self._dirs.items():
+            if key == rel_dir or key.startswith(prefix):
+                sub = key[len(prefix):] if key != rel_dir else ''
+                hidden = self._hidden.get(key, ())
+                for name, is_dir in listing.items():
+                    if name not in hidden:
+                        entries.add((os.path.join(sub, name) if sub else name, is_dir))
+        return entries
+
+    def _reapply_ignore(self, rel_dir):
+        """Re-evaluate ignored entries below a folder whose ignore file changed"""
+        self.ignore.invalidate(rel_dir)
+        if rel_dir not in self._dirs:
+            return False
+        old = self._subtree_entries(rel_dir)
+        self._drop_tree(rel_dir)
+        self._scan_tree(rel_dir)
+        new = self._subtree_entries(rel_dir)
+
+        removed = old - new
+        gone = {path for path, is_dir in removed if is_dir}
+        for path, is_dir in sorted(removed):
+            if os.path.dirname(path) not in gone:
+                self._record('removed', os.path.join(rel_dir, path) if rel_dir else path, is_dir)
+        for path, is_dir in sorted(new - old):
+            self._record('added', os.path.join(rel_dir, path) if rel_dir else path, is_dir)
+        return old != new
+
+    def _pair_renames(self, changes):
+        """Collapse removed/added pairs that are known renames"""
+        if not self._renames:
+            return changes
+        removed = {c['path']: c for c in changes if c['action'] == 'removed'}
+        added = {c['path']: c for c in changes if c['action'] == 'added'}
+        extra = []
+        for old_path, new_path in self._renames.items():
+            if old_path not in removed or new_path not in added:
+                continue
+            removed[old_path].update(action='renamed', new_path=new_path)
+            added.pop(new_path)['action'] = None
+            if removed[old_path]['type'] != 'folder':
+                continue
+            # Entries inside a renamed folder move with it; report only
+            # the ones that were added or removed alongside the rename
+            old_entries = self._dropped.get(old_path, set())
+            prefix = new_path + os.sep
+            for path in [p for p in added if p.startswith(prefix)]:
+                sub = (path[len(prefix):], added[path]['type'] == 'folder')
+                if sub in old_entries:
+                    old_entries.discard(sub)
+                    added.pop(path)['action'] = None
+            gone = {sub_path for sub_path, is_dir in old_entries if is_dir}
+            for sub_path, is_dir in sorted(old_entries):
+                if os.path.dirname(sub_path) in gone:
+                    continue
+                extra.append({
+                    'action': 'removed',
+                    'path': os.path.join(new_path, sub_path),
+                    'type': 'folder' if is_dir else 'file'
+                })
+        self._dropped.clear()
+        return [c for c in changes if c['action']] + extra
+
+    def note_modified(self, rel_path):
+        """Record that the file at rel_path was written"""
+        if not self.ignore.is_path_ignored(rel_path, False):
+            self._modified.add(rel_path)
+
+    def add_listener(self, callback):
+        """Call ``callback(event)`` after each sync that found changes.
+
+        ``event`` has the tree ``version`` and ``epoch`` plus a list of
+        ``changes`` in the same format as ``changes_since``, with extra
+        ``modified`` entries for files whose content was written.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def note_rename(self, old_rel, new_rel):
+        """Record that old_rel was renamed to new_rel (used by FileManager)"""
+        self._renames[old_rel] = new_rel
+
+    def _nearest_indexed(self, rel_dir):
+        while rel_dir and rel_dir not in self._dirs:
+            rel_dir = os.path.dirname(rel_dir)
+        return rel_dir
+
+    def mark_dirty(self, rel_dir):
+        """Schedule a directory for rescan (used after our own writes)"""
+        self._dirty.add(self._nearest_indexed(rel_dir))
+
+    def sync(self):
+        """Apply pending watcher events and rescans; return True on change"""
+        for rel_dir, name, mask, cookie in self._watcher.read_events():
+            if name in IGNORE_FILE_NAMES:
+                self._ignore_changed.add(rel_dir)
+            if mask & IN_MOVED_FROM:
+                self._moves[cookie] = os.path.join(rel_dir, name) if rel_dir else name
+            elif mask & IN_MOVED_TO and cookie in self._moves:
+                self._renames[self._moves.pop(cookie)] = os.path.join(rel_dir, name) if rel_dir else name
+
+            if mask & IN_CLOSE_WRITE:
+                self.note_modified(os.path.join(rel_dir, name) if rel_dir else name)
+                continue
+            if mask & IN_MOVED_TO and not mask & IN_ISDIR:
+                # Atomic saves replace the file by renaming a temp file over it
+                self.note_modified(os.path.join(rel_dir, name) if rel_dir else name)
+            if rel_dir is None:
+                # Event queue overflowed - the whole index may be stale
+                self._dirty.update(self._dirs)
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._dirty.add(os.path.dirname(rel_dir) if rel_dir else '')
+            else:
+                self._dirty.add(rel_dir)
+
+        changed = False
+        while self._dirty:
+            # Parents first, so removed subtrees are never rescanned
+            rel_dir = min(self._dirty, key=len)
+            self._dirty.discard(rel_dir)
+            if self._rescan(rel_dir):
+                changed = True
+
+        # Parents first; a parent's rescan already covers its subfolders
+        done = []
+        for rel_dir in sorted(self._ignore_changed, key=len):
+            if any(rel_dir == d or not d or rel_dir.startswith(d + os.sep) for d in done):
+                continue
+            done.append(rel_dir)
+            if self._reapply_ignore(rel_dir):
+                changed = True
+        self._ignore_changed.clear()
+
+        # Moves out of the workspace never see their IN_MOVED_TO half
+        self._moves.clear()
+        changes = []
+        if changed:
+            self.version += 1
+            self._render_cache.clear()
+            changes = self._log_changes()
+        self._renames.clear()
+
+        if self._modified:
+            known = {c.get('new_path', c['path']) for c in changes if c['action'] != 'removed'}
+            changes = changes + [
+                {'action': 'modified', 'path': path, 'type': 'file', 'version': self.version}
+                for path in sorted(self._modified - known)
+            ]
+            self._modified.clear()
+        if changes:
+            self._notify(changes)
+        return changed
+
+    def _notify(self, changes):
+        event = {'version': self.version, 'epoch': self.epoch, 'changes': changes}
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.warning(f'Error in file change listener: {e}')
+
+    def _log_changes(self):
+        changes = self._pair_renames(self._pending_changes)
+        for change in changes:
+            if len(self._change_log) >= CHANGE_LOG_SIZE:
+                self._truncated_version = self._change_log.popleft()['version']
+            change['version'] = self.version
+            self._change_log.append(change)
+        self._pending_changes = []
+        return changes
+
+    def changes_since(self, since):
+        """Return changes newer than ``since``, or None if they are unknown"""
+        self.sync()
+        if since < self._truncated_version or since > self.version:
+            return None
+        changes = []
+        for change in reversed(self._change_log):
+            if change['version'] <= since:
+                break
+            changes.append(change)
+        changes.reverse()
+        return changes
+
+    def iter_files(self, rel_dir=''):
+        """Yield relative paths of visible files at or below an indexed folder"""
+        prefix = rel_dir + os.sep
+        for key, entries in list(self._dirs.items()):
+            if rel_dir and key != rel_dir and not key.startswith(prefix):
+                continue
+            hidden = self._hidden.get(key, ())
+            for name, is_dir in entries.items():
+                if not is_dir and name not in hidden:
+                    yield os.path.join(key, name) if key else name
+
+    def is_indexed(self, rel_dir):
+        return rel_dir in self._dirs
+
+    def get_tree(self, rel_dir='', max_depth=2):
+        """Return the nested tree structure served by /api/files/tree"""
+        self.sync()
+        key = (rel_dir, max_depth)
+        tree = self._render_cache.get(key)
+        if tree is None:
+            tree = self._render(rel_dir, 0, max_depth) or {}
+            self._render_cache[key] = tree
+        return tree
+
+    def _render(self, rel_dir, depth, max_depth):
+        if depth > max_depth:
+            return None
+        entries = self._dirs.get(rel_dir, {})
+        if len(entries) > MAX_DIR_ENTRIES:
+            return {}
+
+        hidden = self._hidden.get(rel_dir, ())
+        tree = {}
+        for name in sorted(entries)[:MAX_LISTED_ENTRIES]:
+            if name in hidden:
+                continue
+            if entries[name]:
+                child = os.path.join(rel_dir, name) if rel_dir else name
+                children = self._render(child, depth + 1, max_depth)
+                if children is not None:
+                    tree[name] = {
+                        'type': 'folder',
+                        'children': children
+                    }
+                    if len(self._dirs.get(child, ())) > MAX_LISTED_ENTRIES:
+                        # Not all entries fit; /api/files/list pages through them
+                        tree[name]['truncated'] = True
+            else:
+                tree[name] = {
+                    'type': 'file',
+                    'content': ''
+                }
+        return tree
+
+    def _watch_loop(self):
+        while self._running:
+            try:
+                fd = self._watcher.fileno()
+                if fd is not None:
+                    r, _, _ = select.select([fd], [], [], self.poll_interval)
+                    if r and self.coalesce_delay:
+                        # Let a burst of events settle into a single rescan
+                        eventlet.sleep(self.coalesce_delay)
+                else:
+                    eventlet.sleep(self.poll_interval)
+                self.sync()
+            except Exception as e:
+                logger.warning(f'Error watching {self.root}: {e}')
+                eventlet.sleep(self.poll_interval)
+
+    def start(self):
+        """Start the background watcher greenthread"""
+        if not self._running:
+            self._running = True
+            self._thread = eventlet.spawn(self._watch_loop)
+
+    def stop(self):
+        """Stop watching and release watcher resources"""
+        self._running = False
+        if self._thread:
+            self._thread.kill()
+            self._thread = None
+        self._watcher.close()
@@ -1,58 +1,274 @@
 import os
+import re
 import json
+import heapq
+import mmap
 import shutil
+import tempfile
+import mimetypes
 from pathlib import Path
+from file_index import FileTreeIndex, MAX_DIR_ENTRIES, MAX_LISTED_ENTRIES
+from content_cache import ContentCache, DEFAULT_CACHE_BYTES
+from write_behind import WriteBehindQueue
+from text_patch import DiffFormatError, PatchError, apply_edits, apply_unified_diff, content_hash
+from file_batch import BatchTransaction
+from search_index import SearchIndex
+from path_finder import PathIndex, DEFAULT_RESULT_LIMIT
+from blocking_io import BlockingIOPool, DEFAULT_IO_THREADS, DEFAULT_IO_TIMEOUT
+from path_resolver import PathResolver, PathEscapeError
+from trash import TrashCollector
+
+# Files larger than this are not inlined into /api/files/read responses
+MAX_INLINE_READ_SIZE = 5 * 1024 * 1024
+# Bytes inspected when deciding whether a file is binary
+SNIFF_SIZE = 8192
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 'none' leaves flushing to the OS, 'fdatasync' syncs data before the rename
+DURABILITY_MODES = ('none', 'fdatasync')
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_text(abs_path, content, durability='none'):
+    """Write a text file via a temp file and rename, so readers never see it truncated"""
+    # Write through symlinks to their target rather than replacing the link
+    target = os.path.realpath(abs_path)
+    directory, name = os.path.split(target)
+    # Hidden temp name, so the tree index and fs_changed events skip it
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            if durability == 'fdatasync':
+                os.fdatasync(f.fileno())
+        try:
+            mode = os.stat(target).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if durability == 'fdatasync':
+        # Persist the rename itself
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def read_text_file(abs_path):
+    """Return (stat, content) of a text file"""
+    with open(abs_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return os.fstat(f.fileno()), f.read()
+
+
+def remove_path(abs_path):
+    """Remove a file, link or whole folder"""
+    if os.path.isdir(abs_path) and not os.path.islink(abs_path):
+        shutil.rmtree(abs_path)
+    else:
+        os.remove(abs_path)
+
+
+def clear_directory(abs_path):
+    """Remove every non-hidden entry of a folder; returns (removed count, errors)"""
+    cleared_count = 0
+    errors = []
+    for item_name in os.listdir(abs_path):
+        # Skip hidden files (including .gitkeep, .git, etc.)
+        if item_name.startswith('.'):
+            continue
+        try:
+            remove_path(os.path.join(abs_path, item_name))
+            cleared_count += 1
+        except Exception as e:
+            errors.append(f'Error removing {item_name}: {e}')
+    return cleared_count, errors
+
 
 class FileManager:
     """Manages file system operations for the IDE"""
 
-    def __init__(self, workspace_root=None):
+    def __init__(self, workspace_root=None, watch=True, max_inline_size=MAX_INLINE_READ_SIZE,
+                 cache_size=DEFAULT_CACHE_BYTES, durability='none', write_behind_delay=None,
+                 ignore_patterns=(), io_threads=DEFAULT_IO_THREADS, io_timeout=DEFAULT_IO_TIMEOUT, io_pool=None):
         self.workspace_root = workspace_root or os.path.expanduser('~')
+        # Extra .gitignore-style patterns on top of the built-in exclusions
+        self.ignore_patterns = tuple(ignore_patterns)
+        self.max_inline_size = max_inline_size
+        self.content_cache = ContentCache(cache_size)
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f'durability must be one of {DURABILITY_MODES}')
+        self.durability = durability
+        # Large reads, writes and deletes run in worker threads (a pool may
+        # be shared by several workspaces)
+        self.io = io_pool or BlockingIOPool(io_threads, io_timeout)
+        # Saves to existing files are coalesced when a delay is configured
+        self.write_queue = None
+        if write_behind_delay:
+            self.write_queue = WriteBehindQueue(self._write_to_disk, write_behind_delay)
         # Ensure workspace root exists
         os.makedirs(self.workspace_root, exist_ok=True)
+        self.paths = PathResolver(self.workspace_root)
+        # Deleted folders and cleared entries are moved aside and removed in the background
+        self._job_listeners = []
+        self.trash = TrashCollector(self.workspace_root, self.io)
+        self.watch = watch
+        self.tree_index = None
+        self._tree_listeners = []
+        self._init_tree_index()
+        self.add_tree_listener(self._invalidate_cached)
+
+    def _init_tree_index(self):
+        """Build the in-memory tree index for the current workspace"""
+        if self.tree_index:
+            self.search_index.stop()
+            self.tree_index.stop()
+        self.tree_index = FileTreeIndex(self.workspace_root, ignore_patterns=self.ignore_patterns)
+        for callback in self._tree_listeners:
+            self.tree_index.add_listener(callback)
+        self.search_index = SearchIndex(self.tree_index)
+        self.path_index = PathIndex(self.tree_index)
+        if self.watch:
+            self.tree_index.start()
+            self.search_index.start_build()
+
+    def add_tree_listener(self, callback):
+        """Register a callback for file changes, kept across workspace switches"""
+        self._tree_listeners.append(callback)
+        self.tree_index.add_listener(callback)
+
+    def _invalidate_cached(self, event):
+        """Drop cached content and folder real paths for entries reported changed by the watcher"""
+        root = self.tree_index.root
+        for change in event['changes']:
+            folder = change['type'] == 'folder'
+            for path in (change['path'], change.get('new_path')):
+                if path:
+                    self.content_cache.invalidate(os.path.join(root, path), folder)
+                    if folder:
+                        self.paths.invalidate(os.path.join(root, path))
+
+    def get_cache_stats(self):
+        """Get content cache hit/miss/eviction counters"""
+        return self.content_cache.stats()
+
+    def _rel_path(self, abs_path):
+        """Convert an absolute path inside the workspace to an index key"""
+        rel_path = os.path.relpath(abs_path, os.path.normpath(self.workspace_root))
+        return '' if rel_path == '.' else rel_path
+
+    def _mark_changed(self, abs_path):
+        """Tell the tree index that the entry at abs_path was added/removed"""
+        self.tree_index.mark_dirty(self._rel_path(os.path.dirname(abs_path)))
+
+    def _forget(self, abs_path):
+        """Drop queued writes and cached content for a removed/moved entry"""
+        if self.write_queue:
+            self.write_queue.discard(abs_path, folder=True)
+        self.content_cache.invalidate(abs_path, folder=True)
+        self.paths.invalidate(abs_path)
+        self._mark_changed(abs_path)
+
+    def _remove(self, abs_path):
+        """Remove a file or folder in a worker thread"""
+        self.io.run('remove', remove_path, abs_path)
+
+    def add_job_listener(self, callback):
+        """Register callback(info) for deletion job progress, kept across workspace switches"""
+        self._job_listeners.append(callback)
+        self.trash.add_listener(callback)
+
+    def _trash(self, abs_paths):
+        """Move entries to the trash for background deletion; returns (job info or None, errors)"""
+        job = self.trash.new_job()
+        errors = self.io.run('trash', self.trash.move, job, abs_paths)
+        self.trash.submit(job)
+        return (job.info() if job.paths else None), errors
 
     def _get_safe_path(self, relative_path):
-        """Get absolute path and ensure it's within workspace"""
-        # Remove leading slash if present
-        if relative_path.startswith('/'):
-            relative_path = relative_path[1:]
-
-        abs_path = os.path.normpath(os.path.join(self.workspace_root, relative_path))
+        """Get absolute path and ensure it's within workspace, symlinks included"""
+        return self.paths.resolve(relative_path)
 
-        # Security check: ensure path is within workspace
-        if not abs_path.startswith(os.path.normpath(self.workspace_root)):
-            raise ValueError("Access denied: path outside workspace")
+    def list_files(self, path='', cursor=None, limit=None, details=False, show_hidden=False):
+        """List files and directories at the given path.
 
-        return abs_path
-
-    def list_files(self, path=''):
-        """List files and directories at the given path"""
+        Entries are sorted by name. With ``limit`` the listing is paged:
+        pass the returned ``next_cursor`` back as ``cursor`` to continue
+        after the last entry. Entry types come from ``os.scandir`` so no
+        extra stat is needed unless ``details`` asks for size and mtime.
+        """
         try:
             abs_path = self._get_safe_path(path)
 
             if not os.path.exists(abs_path):
                 return {'error': 'Path does not exist'}
+            if not os.path.isdir(abs_path):
+                return {'error': 'Path is not a folder'}
 
-            items = []
-            for item_name in sorted(os.listdir(abs_path)):
-                # Skip hidden files
-                if item_name.startswith('.'):
-                    continue
-
-                item_path = os.path.join(abs_path, item_name)
-                is_dir = os.path.isdir(item_path)
-
-                items.append({
-                    'name': item_name,
-                    'type': 'folder' if is_dir else 'file',
-                    'path': os.path.join(path, item_name) if path else item_name
-                })
+            total = 0
+            remaining = []
+            with os.scandir(abs_path) as it:
+                for entry in it:
+                    # Skip hidden files
+                    if not show_hidden and entry.name.startswith('.'):
+                        continue
+                    total += 1
+                    if cursor is None or entry.name > cursor:
+                        remaining.append(entry)
+
+            if limit is None:
+                page = sorted(remaining, key=lambda e: e.name)
+            else:
+                page = heapq.nsmallest(limit + 1, remaining, key=lambda e: e.name)
+            has_more = limit is not None and len(page) > limit
+            if has_more:
+                page = page[:limit]
 
-            return {'items': items}
+            items = [self._list_item(entry, details) for entry in page]
+            return {
+                'items': items,
+                'total': total,
+                'next_cursor': items[-1]['name'] if has_more else None
+            }
 
         except Exception as e:
             return {'error': str(e)}
 
+    def _list_item(self, entry, details):
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        rel_path = self._rel_path(entry.path)
+        item = {
+            'name': entry.name,
+            'type': 'folder' if is_dir else 'file',
+            'path': rel_path
+        }
+        if self.tree_index.ignore.is_ignored(rel_path, is_dir):
+            # Not part of the tree; the client can still expand it lazily
+            item['excluded'] = True
+        if details:
+            try:
+                stat = entry.stat()
+                item['size'] = stat.st_size
+                item['modified'] = stat.st_mtime
+                item['symlink'] = entry.is_symlink()
+            except OSError:
+                pass
+        return item
+
     def get_file_tree(self, path='', max_depth=2):
         """Get recursive file tree structure"""
         try:
@@ -61,55 +277,91 @@ class FileManager:
             if not os.path.exists(abs_path):
                 return {'error': 'Path does not exist'}
 
-            def build_tree(current_path, current_depth=0):
-                if current_depth > max_depth:
-                    return None
-
-                tree = {}
-                try:
-                    items = os.listdir(current_path)
-                    # Limit number of items to prevent hanging
-                    if len(items) > 500:
-                        return {}
-
-                    for item_name in sorted(items)[:200]:  # Max 200 items per directory
-                        # Skip hidden files and common excluded directories
-                        excluded = ['node_modules', '__pycache__', 'venv', 'env', 'Library',
-                                  'Applications', 'System', '.Trash', 'Downloads', 'Movies',
-                                  'Music', 'Pictures', 'Public', '.npm', '.cache']
-                        if item_name.startswith('.') or item_name in excluded:
-                            continue
+            rel_path = self._rel_path(abs_path)
+            if self.tree_index.is_indexed(rel_path):
+                return self.tree_index.get_tree(rel_path, max_depth)
 
-                        item_path = os.path.join(current_path, item_name)
-
-                        try:
-                            if os.path.isdir(item_path):
-                                children = build_tree(item_path, current_depth + 1)
-                                if children is not None:
-                                    tree[item_name] = {
-                                        'type': 'folder',
-                                        'children': children
-                                    }
-                            else:
-                                # Don't read file content in tree endpoint - too slow
-                                tree[item_name] = {
-                                    'type': 'file',
-                                    'content': ''
-                                }
-                        except (PermissionError, OSError):
-                            # Skip files/folders we can't access
-                            continue
+            # Paths outside the index (excluded or symlinked dirs) are walked
+            return self._walk_tree(abs_path, max_depth)
 
-                except PermissionError:
-                    pass
+        except Exception as e:
+            return {'error': str(e)}
 
-                return tree
+    def get_tree_version(self):
+        """Get the current version of the file tree index"""
+        self.tree_index.sync()
+        return {'version': self.tree_index.version, 'epoch': self.tree_index.epoch}
+
+    def is_tree_indexed(self, path=''):
+        """True if the tree at path is served from the index, so its version covers it"""
+        try:
+            return self.tree_index.is_indexed(self._rel_path(self._get_safe_path(path)))
+        except Exception:
+            return False
+
+    def get_tree_changes(self, since, epoch=None):
+        """Get entries added, removed or renamed since a tree version.
+
+        If the changes are no longer known (log truncated, different epoch)
+        the result has ``reset`` set and the client should reload the tree.
+        """
+        index = self.tree_index
+        changes = None
+        if epoch is None or epoch == index.epoch:
+            changes = index.changes_since(since)
+
+        return {
+            'version': index.version,
+            'epoch': index.epoch,
+            'reset': changes is None,
+            'changes': changes or []
+        }
+
+    def _walk_tree(self, abs_path, max_depth):
+        """Build a file tree by walking the file system directly"""
+        def build_tree(current_path, current_depth=0):
+            if current_depth > max_depth:
+                return None
+
+            tree = {}
+            try:
+                with os.scandir(current_path) as it:
+                    entries = list(it)
+                # Limit number of items to prevent hanging
+                if len(entries) > MAX_DIR_ENTRIES:
+                    return {}
+
+                entries.sort(key=lambda e: e.name)
+                for entry in entries[:MAX_LISTED_ENTRIES]:
+                    try:
+                        is_dir = entry.is_dir()
+                        # Skip hidden files and ignored entries
+                        if self.tree_index.ignore.is_ignored(self._rel_path(entry.path), is_dir):
+                            continue
+
+                        if is_dir:
+                            children = build_tree(entry.path, current_depth + 1)
+                            if children is not None:
+                                tree[entry.name] = {
+                                    'type': 'folder',
+                                    'children': children
+                                }
+                        else:
+                            # Don't read file content in tree endpoint - too slow
+                            tree[entry.name] = {
+                                'type': 'file',
+                                'content': ''
+                            }
+                    except (PermissionError, OSError):
+                        # Skip files/folders we can't access
+                        continue
+
+            except (PermissionError, NotADirectoryError):
+                pass
 
-            tree = build_tree(abs_path)
             return tree
 
-        except Exception as e:
-            return {'error': str(e)}
+        return build_tree(abs_path)
 
     def read_file(self, file_path):
         """Read file content"""
@@ -122,33 +374,260 @@ class FileManager:
             if not os.path.isfile(abs_path):
                 return {'error': 'Path is not a file'}
 
-            with open(abs_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = self._read_cached(abs_path)
+            if content is None:
+                # Return metadata only for binary or huge files; their content
+                # is available through the streaming endpoint instead
+                info = self._file_info(abs_path, file_path)
+                if info['binary'] or info['too_large']:
+                    return info
+                content = self._read_text(abs_path)
 
             return {
                 'content': content,
-                'path': file_path
+                'path': file_path,
+                'hash': content_hash(content)
+            }
+
+        except Exception as e:
+            return {'error': str(e)}
+
+    def _read_cached(self, abs_path):
+        """Return content queued for writing or cached, without disk reads"""
+        if self.write_queue:
+            pending = self.write_queue.get_pending(abs_path)
+            if pending is not None:
+                return pending
+        return self.content_cache.get(abs_path, os.stat(abs_path))
+
+    def _read_text(self, abs_path):
+        """Read a text file from disk and cache it"""
+        stat, content = self.io.run('read', read_text_file, abs_path)
+        self.content_cache.put(abs_path, stat, content)
+        return content
+
+    def _file_info(self, abs_path, file_path):
+        """Sniff size, type and binary-ness of a file without reading it all"""
+        self._flush_pending(abs_path)
+        stat = os.stat(abs_path)
+        with open(abs_path, 'rb') as f:
+            head = f.read(SNIFF_SIZE)
+
+        return {
+            'path': file_path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'mime': mimetypes.guess_type(abs_path)[0] or 'application/octet-stream',
+            'binary': b'\0' in head,
+            'too_large': stat.st_size > self.max_inline_size
+        }
+
+    def get_file_info(self, file_path):
+        """Get file metadata (size, mtime, mime type, binary flag)"""
+        try:
+            abs_path = self._get_safe_path(file_path)
+
+            if not os.path.isfile(abs_path):
+                return {'error': 'File does not exist'}
+
+            return self._file_info(abs_path, file_path)
+
+        except Exception as e:
+            return {'error': str(e)}
+
+    def open_file_range(self, file_path, offset=0, length=None):
+        """Resolve a byte range of a file for streaming.
+
+        Returns the absolute path, total size and the clamped offset/length,
+        or an error if the file is missing or the range is unsatisfiable.
+        """
+        try:
+            abs_path = self._get_safe_path(file_path)
+
+            if not os.path.isfile(abs_path):
+                return {'error': 'File does not exist'}
+
+            self._flush_pending(abs_path)
+            size = os.path.getsize(abs_path)
+            if offset < 0 or (length is not None and length < 0) or (offset > 0 and offset >= size):
+                return {'error': 'Invalid range', 'size': size}
+
+            end = size if length is None else min(size, offset + length)
+            return {
+                'abs_path': abs_path,
+                'path': file_path,
+                'size': size,
+                'offset': offset,
+                'length': end - offset,
+                'mime': mimetypes.guess_type(abs_path)[0] or 'application/octet-stream'
             }
 
         except Exception as e:
             return {'error': str(e)}
 
+    def iter_file_range(self, abs_path, offset, length, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield a byte range of a file in chunks, served from mmap when possible"""
+        with open(abs_path, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty or non-mappable files fall back to positional reads
+                mapped = None
+
+            try:
+                end = offset + length
+                position = offset
+                while position < end:
+                    size = min(chunk_size, end - position)
+                    if mapped is not None:
+                        chunk = mapped[position:position + size]
+                    else:
+                        chunk = os.pread(f.fileno(), size, position)
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    yield chunk
+            finally:
+                if mapped is not None:
+                    mapped.close()
+
     def write_file(self, file_path, content):
         """Write content to a file"""
         try:
             abs_path = self._get_safe_path(file_path)
 
+            if self.write_queue and os.path.isfile(abs_path):
+                self.write_queue.enqueue(abs_path, content)
+                return {'success': True, 'path': file_path, 'hash': content_hash(content), 'queued': True}
+
             # Create parent directories if they don't exist
             os.makedirs(os.path.dirname(abs_path), exist_ok=True)
 
-            with open(abs_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            self._write_to_disk(abs_path, content)
 
-            return {'success': True, 'path': file_path}
+            return {'success': True, 'path': file_path, 'hash': content_hash(content)}
+
+        except Exception as e:
+            return {'error': str(e)}
+
+    def patch_file(self, file_path, base_hash, edits=None, diff=None):
+        """Apply text edits or a unified diff to a file.
+
+        ``base_hash`` is the hash returned by read_file/patch_file for the
+        content the edits were made against; if the file has changed since,
+        nothing is written and the result has ``conflict`` set.
+        """
+        try:
+            abs_path = self._get_safe_path(file_path)
+
+            if not os.path.isfile(abs_path):
+                return {'error': 'File does not exist'}
+
+            content = self._read_cached(abs_path)
+            if content is None:
+                if self._file_info(abs_path, file_path)['binary']:
+                    return {'error': 'Cannot patch a binary file'}
+                content = self._read_text(abs_path)
+
+            current_hash = content_hash(content)
+            if base_hash != current_hash:
+                return {'error': 'File changed since base version', 'conflict': True, 'hash': current_hash}
+
+            try:
+                if diff is not None:
+                    new_content = apply_unified_diff(content, diff)
+                else:
+                    new_content = apply_edits(content, edits or [])
+            except DiffFormatError as e:
+                return {'error': str(e), 'invalid': True}
+            except PatchError as e:
+                return {'error': str(e), 'conflict': True, 'hash': current_hash}
+
+            return self.write_file(file_path, new_content)
+
+        except Exception as e:
+            return {'error': str(e)}
+
+    def _write_to_disk(self, abs_path, content):
+        """Atomically write a file and update the index and cache"""
+        self.io.run('write', atomic_write_text, abs_path, content, self.durability)
+        self._mark_changed(abs_path)
+        self.tree_index.note_modified(self._rel_path(abs_path))
+        self.content_cache.invalidate(abs_path)
+
+    def _move(self, old_abs_path, new_abs_path):
+        """Rename an entry on disk and update the path cache and tree index"""
+        self._flush_pending(old_abs_path, folder=True)
+        os.rename(old_abs_path, new_abs_path)
+        self.paths.invalidate(old_abs_path)
+        self.tree_index.note_rename(self._rel_path(old_abs_path), self._rel_path(new_abs_path))
+        self._mark_changed(old_abs_path)
+        self._mark_changed(new_abs_path)
+
+    def _flush_pending(self, abs_path, folder=False):
+        if self.write_queue:
+            self.write_queue.flush(abs_path, folder)
+
+    def flush_writes(self, file_path=None):
+        """Write out saves queued by write-behind (all of them if no path)"""
+        try:
+            abs_path = self._get_safe_path(file_path) if file_path else None
+            errors = self.write_queue.flush(abs_path) if self.write_queue else []
+            if errors:
+                return {'error': 'Some writes failed', 'failed': errors}
+            return {'success': True}
 
         except Exception as e:
             return {'error': str(e)}
 
+    def clear_workspace(self, background=True):
+        """Remove every non-hidden entry of the workspace root
+
+        In the background (the default) the entries are moved to the trash,
+        so the workspace is empty on return, and deleted by a job whose
+        ``job_id`` is returned.
+        """
+        os.makedirs(self.workspace_root, exist_ok=True)
+        job_id = None
+        entries = [os.path.join(self.workspace_root, name)
+                   for name in os.listdir(self.workspace_root) if not name.startswith('.')]
+        # Queued saves would otherwise recreate cleared files when their timer fires
+        if self.write_queue:
+            for abs_path in entries:
+                self.write_queue.discard(abs_path, folder=True)
+        if background:
+            job, errors = self._trash(entries)
+            cleared_count = len(job['paths']) if job else 0
+            job_id = job['job_id'] if job else None
+        else:
+            cleared_count, errors = self.io.run('clear', clear_directory, self.workspace_root)
+        self.content_cache.clear()
+        self.paths.invalidate()
+        self.tree_index.mark_dirty('')
+        return {'cleared_count': cleared_count, 'errors': errors, 'job_id': job_id}
+
+    def get_deletion_job(self, job_id):
+        """Get the state and progress of a background deletion"""
+        job = self.trash.get(job_id)
+        if job is None:
+            return {'error': 'Unknown job'}
+        return job
+
+    def get_deletion_stats(self):
+        """Get recent background deletions and the queue length"""
+        return self.trash.stats()
+
+    def get_io_stats(self):
+        """Get worker thread pool counters for blocking disk operations"""
+        return self.io.stats()
+
+    def get_write_stats(self):
+        """Get write mode and write-behind queue counters"""
+        stats = {'durability': self.durability, 'write_behind': self.write_queue is not None}
+        if self.write_queue:
+            stats.update(self.write_queue.stats())
+        return stats
+
     def create_file(self, file_path, content=''):
         """Create a new file"""
         try:
@@ -160,8 +639,8 @@ class FileManager:
             # Create parent directories if they don't exist
             os.makedirs(os.path.dirname(abs_path), exist_ok=True)
 
-            with open(abs_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            self.io.run('write', atomic_write_text, abs_path, content, self.durability)
+            self._mark_changed(abs_path)
 
             return {'success': True, 'path': file_path}
 
@@ -177,6 +656,7 @@ class FileManager:
                 return {'error': 'Folder already exists'}
 
             os.makedirs(abs_path, exist_ok=True)
+            self._mark_changed(abs_path)
 
             return {'success': True, 'path': folder_path}
 
@@ -192,7 +672,10 @@ class FileManager:
                 return {'error': 'File does not exist'}
 
             if os.path.isfile(abs_path):
+                if self.write_queue:
+                    self.write_queue.discard(abs_path)
                 os.remove(abs_path)
+                self._mark_changed(abs_path)
             else:
                 return {'error': 'Path is not a file'}
 
@@ -201,8 +684,12 @@ class FileManager:
         except Exception as e:
             return {'error': str(e)}
 
-    def delete_folder(self, folder_path):
-        """Delete a folder and its contents"""
+    def delete_folder(self, folder_path, background=True):
+        """Delete a folder and its contents
+
+        In the background (the default) the folder is moved to the trash
+        and deleted by a job whose ``job_id`` is returned.
+        """
         try:
             abs_path = self._get_safe_path(folder_path)
 
@@ -210,10 +697,22 @@ class FileManager:
                 return {'error': 'Folder does not exist'}
 
             if os.path.isdir(abs_path):
-                shutil.rmtree(abs_path)
+                if abs_path == os.path.normpath(self.workspace_root):
+                    return {'error': 'Cannot delete the workspace root'}
+                if self.write_queue:
+                    self.write_queue.discard(abs_path, folder=True)
+                job = None
+                if background:
+                    job, errors = self._trash([abs_path])
+                if job is None:
+                    # Also for folders that cannot be moved, e.g. mount points
+                    self.io.run('rmtree', shutil.rmtree, abs_path)
+                self._forget(abs_path)
             else:
                 return {'error': 'Path is not a folder'}
 
+            if job is not None:
+                return {'success': True, 'job_id': job['job_id']}
             return {'success': True}
 
         except Exception as e:
@@ -232,13 +731,15 @@ class FileManager:
             new_abs_path = os.path.join(parent_dir, new_name)
 
             # Security check for new path
-            if not new_abs_path.startswith(os.path.normpath(self.workspace_root)):
+            try:
+                new_abs_path = self.paths.check(new_abs_path)
+            except PathEscapeError:
                 return {'error': 'Access denied'}
 
             if os.path.exists(new_abs_path):
                 return {'error': 'Target path already exists'}
 
-            os.rename(old_abs_path, new_abs_path)
+            self._move(old_abs_path, new_abs_path)
 
             # Calculate relative path
             new_rel_path = os.path.relpath(new_abs_path, self.workspace_root)
@@ -248,6 +749,59 @@ class FileManager:
         except Exception as e:
             return {'error': str(e)}
 
+    def iter_search(self, query, regex=False, case_sensitive=False):
+        """Yield workspace search matches (raises re.error for a bad regex)"""
+        return self.search_index.iter_matches(query, regex, case_sensitive)
+
+    def search(self, query, regex=False, case_sensitive=False, offset=0, limit=100):
+        """Search file contents, returning one page of line matches"""
+        try:
+            matches = []
+            has_more = False
+            for index, match in enumerate(self.iter_search(query, regex, case_sensitive)):
+                if index < offset:
+                    continue
+                if len(matches) >= limit:
+                    has_more = True
+                    break
+                matches.append(match)
+
+            return {
+                'query': query,
+                'matches': matches,
+                'offset': offset,
+                'next_offset': offset + len(matches) if has_more else None
+            }
+
+        except re.error as e:
+            return {'error': f'Invalid regex: {e}'}
+        except Exception as e:
+            return {'error': str(e)}
+
+    def get_search_stats(self):
+        """Get search index size and build state, and the quick-open path index counters"""
+        return dict(self.search_index.stats(), path_index=self.path_index.stats())
+
+    def find_files(self, query, limit=DEFAULT_RESULT_LIMIT):
+        """Fuzzy-match file paths for quick open"""
+        try:
+            return {'query': query, 'results': self.path_index.find(query, limit)}
+        except Exception as e:
+            return {'error': str(e)}
+
+    def batch(self, operations, transactional=False):
+        """Run create/write/delete/rename/mkdir operations in order.
+
+        Returns a result per operation. With ``transactional`` set, the
+        first failure skips the remaining operations and rolls back the
+        ones already applied.
+        """
+        if not isinstance(operations, list):
+            return {'error': 'operations must be a list'}
+        if not all(isinstance(operation, dict) for operation in operations):
+            return {'error': 'operations must be objects'}
+        return BatchTransaction(self, transactional).run(operations)
+
     def set_workspace(self, workspace_path):
         """Set the workspace root directory"""
         abs_path = os.path.abspath(os.path.expanduser(workspace_path))
@@ -258,9 +812,24 @@ class FileManager:
         if not os.path.isdir(abs_path):
             return {'error': 'Workspace path is not a directory'}
 
+        self._flush_pending(None)
         self.workspace_root = abs_path
+        self.paths = PathResolver(abs_path)
+        self.trash.stop()
+        self.trash = TrashCollector(abs_path, self.io)
+        for callback in self._job_listeners:
+            self.trash.add_listener(callback)
+        self.content_cache.clear()
+        self._init_tree_index()
         return {'success': True, 'workspace': abs_path}
 
     def get_workspace(self):
         """Get the current workspace root directory"""
         return {'workspace': self.workspace_root}
+
+    def close(self):
+        """Write out queued saves and stop the watcher, indexes and background deletion"""
+        self._flush_pending(None)
+        self.trash.stop()
+        self.search_index.stop()
+        self.tree_index.stop()
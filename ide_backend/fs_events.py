@@ -0,0 +1,59 @@
+import logging
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+
+class FileEventBroadcaster:
+    """Batches file tree changes and pushes them to Socket.IO rooms.
+
+    Changes published for a room are collected for ``debounce`` seconds and
+    then emitted as a single ``fs_changed`` event. If more than ``max_batch``
+    changes pile up, clients get ``reset: true`` and should reload the tree.
+    With ``local_only`` events skip the message queue and only reach clients
+    connected to this process.
+    """
+
+    def __init__(self, socket_io, debounce=0.03, max_batch=1000, namespace='/', local_only=False):
+        self.socket_io = socket_io
+        self.local_only = local_only
+        self.debounce = debounce
+        self.max_batch = max_batch
+        self.namespace = namespace
+        self._pending = {}  # room -> {'version', 'epoch', 'changes', 'reset'}
+        self._timers = {}
+
+    def publish(self, room, event):
+        """Queue a change event (as produced by FileTreeIndex) for a room"""
+        batch = self._pending.get(room)
+        if batch is None or batch['epoch'] != event['epoch']:
+            batch = {'version': event['version'], 'epoch': event['epoch'], 'changes': [], 'reset': batch is not None}
+            self._pending[room] = batch
+
+        batch['version'] = event['version']
+        if not batch['reset']:
+            batch['changes'].extend(event['changes'])
+            if len(batch['changes']) > self.max_batch:
+                batch['reset'] = True
+                batch['changes'] = []
+
+        if room not in self._timers:
+            self._timers[room] = eventlet.spawn_after(self.debounce, self.flush, room)
+
+    def listener(self, room):
+        """Return a FileTreeIndex listener that publishes to ``room``"""
+        return lambda event: self.publish(room, event)
+
+    def flush(self, room):
+        """Emit the pending batch for a room immediately"""
+        timer = self._timers.pop(room, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(room, None)
+        if batch is None:
+            return
+        try:
+            self.socket_io.emit('fs_changed', batch, to=room, namespace=self.namespace,
+                                ignore_queue=self.local_only)
+        except Exception as e:
+            logger.warning(f'Error emitting fs_changed to {room}: {e}')
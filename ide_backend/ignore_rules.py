@@ -0,0 +1,216 @@
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Folders that are never worth showing or indexing in a workspace
+EXCLUDED_NAMES = frozenset([
+    'node_modules', '__pycache__', 'venv', 'env', 'Library',
+    'Applications', 'System', '.Trash', 'Downloads', 'Movies',
+    'Music', 'Pictures', 'Public', '.npm', '.cache'
+])
+
+# Hidden entries plus the excluded folders above, in .gitignore syntax
+DEFAULT_IGNORE_PATTERNS = ('.*',) + tuple(sorted(EXCLUDED_NAMES))
+
+# Per-directory ignore files, read in this order (later ones win)
+IGNORE_FILE_NAMES = ('.gitignore', '.ideignore')
+
+
+def _translate(pattern):
+    """Translate one .gitignore pattern (without a trailing '/') into a regex.
+
+    Patterns containing a slash are anchored and match the path relative
+    to the ignore file's folder; the others can never match across a
+    slash, so they match the entry name alone. Returns (anchored, regex).
+    """
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/'):
+                if i + 2 == n:
+                    out.append('.*')
+                    i += 2
+                    continue
+                if pattern.startswith('/', i + 2):
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+            while i + 1 < n and pattern[i + 1] == '*':
+                i += 1
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                out.append('(?!/)[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    return anchored, ''.join(out)
+
+
+class IgnoreRules:
+    """Compiled patterns from one ignore file (or the built-in defaults).
+
+    Consecutive patterns with the same sign are merged into a group with
+    one name regex and one path regex per entry type (patterns ending in
+    '/' only join the folder ones). Groups are tried from last to first,
+    so evaluating a path costs a few regex matches however long the file
+    is, while the last matching pattern still decides as in git.
+    """
+
+    def __init__(self, lines):
+        groups = []
+        for line in lines:
+            line = line.rstrip('\n\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith(('\\#', '\\!')):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            if not groups or groups[-1][0] != negated:
+                # (name, path) regexes for files, then for folders
+                groups.append((negated, ([], []), ([], [])))
+            anchored, regex = _translate(line)
+            kinds = (True,) if dir_only else (False, True)
+            for is_dir in kinds:
+                groups[-1][1 + is_dir][anchored].append(regex)
+
+        self.groups = []
+        for negated, file_regexes, dir_regexes in reversed(groups):
+            try:
+                self.groups.append((negated, {
+                    False: tuple(self._compile(r) for r in file_regexes),
+                    True: tuple(self._compile(r) for r in dir_regexes)
+                }))
+            except re.error as e:
+                logger.warning(f'Skipping invalid ignore patterns {dir_regexes}: {e}')
+
+    @staticmethod
+    def _compile(regexes):
+        if not regexes:
+            return None
+        return re.compile('|'.join(f'(?:{r})' for r in regexes), re.DOTALL)
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def match(self, rel_path, is_dir):
+        """Return True (ignored), False (re-included) or None (no match)"""
+        name = rel_path.rsplit('/', 1)[-1]
+        for negated, compiled in self.groups:
+            name_regex, path_regex = compiled[is_dir]
+            if (name_regex is not None and name_regex.fullmatch(name)) or \
+                    (path_regex is not None and path_regex.fullmatch(rel_path)):
+                return not negated
+        return None
+
+
+class IgnoreMatcher:
+    """Decides which workspace entries are ignored, .gitignore style.
+
+    The built-in patterns apply first, then ``.gitignore`` and
+    ``.ideignore`` files from the workspace root down to the entry's own
+    folder. Each folder's rules are read and compiled once and cached, and
+    a folder known to have no ignore file (see ``load_dir``) costs no I/O.
+    Paths are relative to ``root`` and use '/' or os.sep.
+    """
+
+    def __init__(self, root, patterns=DEFAULT_IGNORE_PATTERNS, extra_patterns=()):
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.defaults = IgnoreRules(list(patterns) + list(extra_patterns))
+        self._dir_rules = {}  # rel_dir -> IgnoreRules or None
+        self._chains = {}  # rel_dir -> [(rel_dir, IgnoreRules)] root first
+
+    def _read_rules(self, rel_dir, names=None):
+        lines = []
+        for file_name in IGNORE_FILE_NAMES:
+            if names is not None and file_name not in names:
+                continue
+            path = os.path.join(self.root, rel_dir, file_name)
+            try:
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    lines.extend(f.read().splitlines())
+            except OSError:
+                continue
+        rules = IgnoreRules(lines) if lines else None
+        return rules or None
+
+    def load_dir(self, rel_dir, names):
+        """Cache the rules of a folder whose entry names are already known"""
+        if rel_dir not in self._dir_rules:
+            self._dir_rules[rel_dir] = self._read_rules(rel_dir, names)
+
+    def invalidate(self, rel_dir):
+        """Forget cached rules at and below a folder, e.g. after an ignore file changed"""
+        prefix = rel_dir + os.sep if rel_dir else ''
+        for cache in (self._dir_rules, self._chains):
+            for key in [k for k in cache if k == rel_dir or k.startswith(prefix)]:
+                del cache[key]
+
+    def _rules(self, rel_dir):
+        if rel_dir not in self._dir_rules:
+            self._dir_rules[rel_dir] = self._read_rules(rel_dir)
+        return self._dir_rules[rel_dir]
+
+    def _chain(self, rel_dir):
+        chain = self._chains.get(rel_dir)
+        if chain is None:
+            chain = list(self._chain(os.path.dirname(rel_dir))) if rel_dir else []
+            rules = self._rules(rel_dir)
+            if rules:
+                chain.append((rel_dir, rules))
+            self._chains[rel_dir] = chain
+        return chain
+
+    def is_ignored(self, rel_path, is_dir):
+        """Return True if an entry is ignored by the rules of its ancestors.
+
+        Only the entry itself is tested; walkers that never descend into
+        ignored folders need nothing more. Use ``is_path_ignored`` for an
+        arbitrary path.
+        """
+        rel_path = rel_path.replace(os.sep, '/')
+        rel_dir = os.path.dirname(rel_path)
+        ignored = self.defaults.match(rel_path, is_dir)
+        for base, rules in self._chain(rel_dir.replace('/', os.sep)):
+            base = base.replace(os.sep, '/')
+            result = rules.match(rel_path[len(base) + 1:] if base else rel_path, is_dir)
+            if result is not None:
+                ignored = result
+        return bool(ignored)
+
+    def is_path_ignored(self, rel_path, is_dir):
+        """Return True if a path or any folder above it is ignored"""
+        parts = [p for p in rel_path.replace(os.sep, '/').split('/') if p]
+        for depth in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:depth]), True):
+                return True
+        return bool(parts) and self.is_ignored('/'.join(parts), is_dir)
@@ -0,0 +1,47 @@
+import pickle
+import logging
+import socketio
+from eventlet.queue import Queue
+
+logger = logging.getLogger(__name__)
+
+# IDE_MESSAGE_QUEUE value selecting the in-process stand-in below
+LOCAL_QUEUE_URL = 'local://'
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """In-process stand-in for a Redis message queue.
+
+    Every manager on the same channel in this process receives what the
+    others publish, so several Socket.IO servers can be wired together in
+    one process (e.g. in tests) exactly as separate workers would be
+    through Redis.
+    """
+
+    name = 'local'
+    _subscribers = {}  # channel -> [Queue]
+
+    def __init__(self, channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._queue = Queue()
+        if not write_only:
+            self._subscribers.setdefault(channel, []).append(self._queue)
+
+    def _publish(self, data):
+        message = pickle.dumps(data)
+        for queue in self._subscribers.get(self.channel, []):
+            queue.put(message)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
+
+
+def socketio_queue_options(url):
+    """SocketIO() keyword arguments for a message queue URL (None for none)"""
+    if not url:
+        return {}
+    if url == LOCAL_QUEUE_URL:
+        return {'client_manager': LocalPubSubManager()}
+    # redis://, kafka://, zmq+tcp:// or any kombu URL
+    return {'message_queue': url}
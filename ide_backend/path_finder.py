@@ -0,0 +1,185 @@
+import os
+import re
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+DEFAULT_RESULT_LIMIT = 50
+# Lines scored per query at most; short queries match nearly every path
+MAX_SCORED_CANDIDATES = 2000
+# Above this many changes since the last refresh, rebuilding is cheaper
+MAX_INCREMENTAL_CHANGES = 5000
+
+
+class PathIndex:
+    """Compact index of workspace file paths for fuzzy quick-open.
+
+    All lowercased paths are packed into one string, one ``/path`` line each,
+    and their file names into a second one, each with an array of line
+    offsets. Regexes run over the packed strings in C and pick candidates
+    tier by tier: paths whose file name starts with the query, whose name
+    contains it, whose path contains it, and finally any path containing it
+    as a subsequence (scored by its leftmost occurrence; whole occurrences
+    score by their position instead). Only candidates are scored in Python, at most
+    ``MAX_SCORED_CANDIDATES`` per query (later ones in path order are
+    skipped), and the search stops early once no later tier can beat the
+    best ``limit`` found so far. When the tree index version changes, the
+    tree's change log is applied to the sorted path list instead of
+    rebuilding it.
+    """
+
+    def __init__(self, tree_index):
+        self.tree_index = tree_index
+        self._version = None
+        self._paths = []  # sorted
+        self._lines = []  # '/' + lowercased path + newline, parallel to _paths
+        self._names = []  # lowercased file name + newline, parallel to _paths
+        self._blob = ''
+        self._offsets = array('I')  # start of each line, then the blob length
+        self._names_blob = ''
+        self._name_offsets = array('I')
+        self.rebuilds = 0
+        self.updates = 0
+
+    def _refresh(self):
+        self.tree_index.sync()
+        version = self.tree_index.version
+        if self._version == version:
+            return
+        changes = self.tree_index.changes_since(self._version) if self._version is not None else None
+        if changes is None or len(changes) > MAX_INCREMENTAL_CHANGES:
+            self._paths = sorted(self.tree_index.iter_files())
+            self._lines = [f'/{path.lower()}\n' for path in self._paths]
+            self._names = [line[line.rfind('/') + 1:] for line in self._lines]
+            self.rebuilds += 1
+        else:
+            for change in changes:
+                self._apply(change)
+            self.updates += 1
+        # A leading newline lets patterns starting with '\n' match the first line too
+        self._blob = '\n' + ''.join(self._lines)
+        self._offsets = array('I', accumulate(map(len, self._lines), initial=1))
+        self._names_blob = '\n' + ''.join(self._names)
+        self._name_offsets = array('I', accumulate(map(len, self._names), initial=1))
+        self._version = version
+
+    def _apply(self, change):
+        """Apply one change log entry (replayed in order, so adds may be undone later)"""
+        folder = change['type'] == 'folder'
+        if change['action'] in ('removed', 'renamed'):
+            self._remove(change['path'], folder)
+        added = change['new_path'] if change['action'] == 'renamed' else change['path']
+        if change['action'] in ('added', 'renamed'):
+            for path in (self.tree_index.iter_files(added) if folder else (added,)):
+                self._insert(path)
+
+    def _insert(self, path):
+        i = bisect_left(self._paths, path)
+        if i < len(self._paths) and self._paths[i] == path:
+            return
+        line = f'/{path.lower()}\n'
+        self._paths.insert(i, path)
+        self._lines.insert(i, line)
+        self._names.insert(i, line[line.rfind('/') + 1:])
+
+    def _remove(self, path, folder):
+        if folder:
+            start = bisect_left(self._paths, path + os.sep)
+            end = bisect_left(self._paths, path + chr(ord(os.sep) + 1))
+        else:
+            start = bisect_left(self._paths, path)
+            end = start + 1 if start < len(self._paths) and self._paths[start] == path else start
+        del self._paths[start:end]
+        del self._lines[start:end]
+        del self._names[start:end]
+
+    def __len__(self):
+        self._refresh()
+        return len(self._paths)
+
+    @staticmethod
+    def _pattern(query):
+        # Each gap excludes the next wanted character (and newlines), so the
+        # match is the leftmost subsequence and never backtracks
+        first = re.escape(query[0])
+        rest = ''.join(f'[^\\n{re.escape(ch)}]*{re.escape(ch)}' for ch in query[1:])
+        return re.compile(f'{first}({rest})')
+
+    def _tiers(self, query, subsequence):
+        """(highest possible score, regex, packed string, its offsets) from best to worst tier"""
+        contiguous = re.compile(re.escape(query))
+        tiers = []
+        # Only paths containing the query can have it in their file name
+        if contiguous.search(self._blob):
+            if '/' not in query:
+                # File name starts with / contains the query (see _score)
+                tiers.append((220, re.compile('\n' + re.escape(query)), self._names_blob, self._name_offsets))
+                tiers.append((170, contiguous, self._names_blob, self._name_offsets))
+            tiers.append((120, contiguous, self._blob, self._offsets))
+        tiers.append((20, subsequence, self._blob, self._offsets))
+        return tiers
+
+    def _score(self, query, path, lowered, span):
+        name = lowered.rsplit('/', 1)[-1]
+        score = -(span[1] - span[0] - len(query)) * 4 - len(path) * 0.1
+        if query in name:
+            score += 200 if name.startswith(query) else 150
+        elif query in lowered:
+            score += 100
+        if span[0] == 0 or lowered[span[0] - 1] in '/._-':
+            score += 20
+        return score
+
+    def find(self, query, limit=DEFAULT_RESULT_LIMIT):
+        """Return the best fuzzy matches as [{'path', 'name', 'score'}]"""
+        self._refresh()
+        query = query.strip().lower().replace(os.sep, '/')
+        if not query or limit <= 0:
+            return []
+
+        blob = self._blob
+        offsets = self._offsets
+        subsequence = self._pattern(query)
+        best = []  # min-heap of (score, line)
+        seen = set()
+        for top_score, pattern, packed, packed_offsets in self._tiers(query, subsequence):
+            if len(best) >= limit and best[0][0] >= top_score:
+                break
+            for match in pattern.finditer(packed):
+                # +1: a match of '\n' + query starts just before its line
+                line = bisect_right(packed_offsets, match.start() + 1) - 1
+                if line in seen:
+                    continue
+                seen.add(line)
+                start = offsets[line]
+                lowered = blob[start:offsets[line + 1] - 1]
+                if pattern is subsequence:
+                    span = (match.start() - start, match.end() - start)
+                else:
+                    # Score the query where it appears whole, in the file name if it does
+                    position = lowered.find(query, lowered.rfind('/') + 1)
+                    if position < 0:
+                        position = lowered.find(query)
+                    span = (position, position + len(query))
+                entry = (self._score(query, self._paths[line], lowered, span), line)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heappushpop(best, entry)
+                if len(seen) >= MAX_SCORED_CANDIDATES:
+                    break
+            if len(seen) >= MAX_SCORED_CANDIDATES:
+                break
+
+        return [
+            {
+                'path': self._paths[line],
+                'name': os.path.basename(self._paths[line]),
+                'score': round(score, 2)
+            }
+            for score, line in sorted(best, reverse=True)
+        ]
+
+    def stats(self):
+        return {'paths': len(self._paths), 'rebuilds': self.rebuilds, 'updates': self.updates}
@@ -0,0 +1,102 @@
+import os
+import stat
+from collections import OrderedDict
+
+# Directories whose real path is remembered
+DEFAULT_CACHE_SIZE = 4096
+
+
+class PathEscapeError(ValueError):
+    """A path points outside the root it must stay in"""
+
+
+class PathResolver:
+    """Maps root-relative paths to absolute ones, rejecting any that escape.
+
+    A path must lie within the root by whole components (``outputs2/`` is
+    not inside ``outputs/``), and so must its real location: a symlinked
+    folder or file inside the root that points elsewhere is rejected too.
+    Real paths of existing directories are kept in a bounded LRU cache, so
+    checking a file in an already seen folder costs a dict lookup and two
+    lstats rather than a syscall per path component. A cached folder is
+    lstat'ed again on every hit and its entry dropped if it is no longer
+    the same directory (say, replaced by a symlink), so a stale entry can
+    never let a path escape. Call ``invalidate`` when folders are removed
+    or renamed.
+    """
+
+    def __init__(self, root, cache_size=DEFAULT_CACHE_SIZE):
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.real_root = os.path.realpath(self.root)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._real_dirs = OrderedDict()  # abs dir -> (real path, st_dev, st_ino)
+
+    @staticmethod
+    def _within(path, root):
+        return path == root or path.startswith(root if root.endswith(os.sep) else root + os.sep)
+
+    def resolve(self, relative_path):
+        """Return the absolute path for a root-relative one (leading '/' allowed)"""
+        abs_path = os.path.normpath(os.path.join(self.root, relative_path.lstrip('/')))
+        return self.check(abs_path)
+
+    def check(self, abs_path):
+        """Return a normalized absolute path if it stays within the root, else raise PathEscapeError"""
+        abs_path = os.path.normpath(abs_path)
+        if not self._within(abs_path, self.root):
+            raise PathEscapeError('Access denied: path outside workspace')
+        if abs_path == self.root:
+            return abs_path
+
+        if not self._within(self._real_dir(os.path.dirname(abs_path)), self.real_root):
+            raise PathEscapeError('Access denied: path resolves outside workspace')
+        if os.path.islink(abs_path) and not self._within(os.path.realpath(abs_path), self.real_root):
+            raise PathEscapeError('Access denied: symlink points outside workspace')
+        return abs_path
+
+    @staticmethod
+    def _identity(directory):
+        """(st_dev, st_ino) of a real folder (not a symlink), or None"""
+        try:
+            st = os.lstat(directory)
+        except OSError:
+            return None
+        if not stat.S_ISDIR(st.st_mode):
+            return None
+        return st.st_dev, st.st_ino
+
+    def _real_dir(self, directory):
+        cached = self._real_dirs.get(directory)
+        if cached is not None:
+            real, dev, ino = cached
+            if self._identity(directory) == (dev, ino):
+                self.hits += 1
+                self._real_dirs.move_to_end(directory)
+                return real
+            # Replaced since it was cached, e.g. by a symlink
+            del self._real_dirs[directory]
+        self.misses += 1
+        # Taken first, so a swap in between makes the entry miss next time
+        identity = self._identity(directory)
+        real = os.path.realpath(directory)
+        # Only existing folders are cached; a missing one could later be
+        # created as a symlink
+        if identity is not None:
+            self._real_dirs[directory] = (real,) + identity
+            if len(self._real_dirs) > self.cache_size:
+                self._real_dirs.popitem(last=False)
+        return real
+
+    def invalidate(self, abs_path=None):
+        """Forget cached real paths at and below a folder (all of them if None)"""
+        if abs_path is None:
+            self._real_dirs.clear()
+            return
+        abs_path = os.path.normpath(abs_path)
+        for key in [k for k in self._real_dirs if self._within(k, abs_path)]:
+            del self._real_dirs[key]
+
+    def stats(self):
+        return {'cached_dirs': len(self._real_dirs), 'hits': self.hits, 'misses': self.misses}
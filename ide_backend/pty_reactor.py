@@ -0,0 +1,94 @@
+import select
+import logging
+import eventlet
+from eventlet.hubs import trampoline
+
+logger = logging.getLogger(__name__)
+
+
+class PtyReactor:
+    """Dispatches readiness of many file descriptors from one greenthread.
+
+    All registered descriptors (PTY masters, child pidfds) live in a single
+    epoll set. The reactor greenthread blocks on the epoll descriptor itself
+    through the eventlet hub, so it only wakes when some descriptor is
+    ready and idle terminals cost nothing. ``callback()`` is called while
+    its descriptor is readable; it should read what it needs and return.
+    Where epoll is unavailable each descriptor gets its own greenthread
+    waiting in the hub instead.
+    """
+
+    def __init__(self):
+        self._handlers = {}  # fd -> callback
+        self._epoll = select.epoll() if hasattr(select, 'epoll') else None
+        self._thread = None
+        self._fallback_threads = {}
+
+    def register(self, fd, callback):
+        self._handlers[fd] = callback
+        if self._epoll is None:
+            self._fallback_threads[fd] = eventlet.spawn(self._wait_one, fd)
+            return
+        self._epoll.register(fd, select.EPOLLIN)
+        if self._thread is None:
+            self._thread = eventlet.spawn(self._run)
+
+    def unregister(self, fd):
+        if self._handlers.pop(fd, None) is None:
+            return
+        if self._epoll is None:
+            thread = self._fallback_threads.pop(fd, None)
+            if thread is not None and thread is not eventlet.getcurrent():
+                thread.kill()
+            return
+        try:
+            self._epoll.unregister(fd)
+        except (OSError, ValueError):
+            # Already closed; the kernel dropped it from the set
+            pass
+
+    def _dispatch(self, fd):
+        callback = self._handlers.get(fd)
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f'Error handling fd {fd}: {e}')
+            self.unregister(fd)
+
+    def _run(self):
+        while True:
+            try:
+                trampoline(self._epoll.fileno(), read=True)
+                events = self._epoll.poll(0)
+            except Exception as e:
+                logger.error(f'PTY reactor wait failed: {e}')
+                eventlet.sleep(0.1)
+                continue
+            for fd, _ in events:
+                self._dispatch(fd)
+            # Let other greenthreads run between busy rounds
+            eventlet.sleep(0)
+
+    def _wait_one(self, fd):
+        while fd in self._handlers:
+            try:
+                trampoline(fd, read=True)
+            except Exception:
+                self._handlers.pop(fd, None)
+                break
+            self._dispatch(fd)
+        self._fallback_threads.pop(fd, None)
+
+    def count(self):
+        return len(self._handlers)
+
+    def close(self):
+        for fd in list(self._handlers):
+            self.unregister(fd)
+        if self._thread is not None:
+            self._thread.kill()
+            self._thread = None
+        if self._epoll is not None:
+            self._epoll.close()
@@ -0,0 +1,188 @@
+import os
+import logging
+import resource
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+CPU_PERIOD_USEC = 100000
+# Niceness of shells whose CPU share cannot be capped by a cgroup
+FALLBACK_NICE = 10
+CGROUP_CONTROLLERS = ('cpu', 'memory', 'pids')
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _write(path, value):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+class ResourceLimits:
+    """CPU, memory and process limits for terminal shells, plus usage accounting.
+
+    If ``cgroup_parent`` is a writable (delegated) cgroup v2 directory, each
+    shell runs in its own child cgroup with ``cpu.max``, ``memory.max`` and
+    ``pids.max`` set, which covers everything the shell starts and lets a
+    closed session kill its whole process tree. Otherwise the shell gets an
+    address space rlimit and a lower CPU priority, and its usage is summed
+    from /proc over its process session. ``max_pids`` is not enforced
+    then: RLIMIT_NPROC counts every process of the user, so it would cap
+    all terminals and the backend together rather than one shell. Limits
+    left as None are not applied.
+    """
+
+    def __init__(self, cpu_percent=None, memory_bytes=None, max_pids=None, cgroup_parent=None):
+        self.cpu_percent = cpu_percent
+        self.memory_bytes = memory_bytes
+        self.max_pids = max_pids
+        self.cgroup_parent = cgroup_parent if cgroup_parent and self._init_cgroup_parent(cgroup_parent) else None
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+        if self.not_enforced():
+            logger.warning(f'Terminal limits not enforced without a cgroup: {", ".join(self.not_enforced())}')
+
+    def not_enforced(self):
+        """Names of the configured limits the current mode cannot apply"""
+        if not self.cgroup_parent and self.max_pids is not None:
+            return ['max_pids']
+        return []
+
+    def describe(self):
+        return {
+            'mode': 'cgroup' if self.cgroup_parent else 'rlimit',
+            'cpu_percent': self.cpu_percent,
+            'memory_bytes': self.memory_bytes,
+            'max_pids': self.max_pids,
+            'not_enforced': self.not_enforced()
+        }
+
+    @staticmethod
+    def _init_cgroup_parent(path):
+        try:
+            available = _read(os.path.join(path, 'cgroup.controllers')).split()
+            wanted = ' '.join(f'+{c}' for c in CGROUP_CONTROLLERS if c in available)
+            if wanted:
+                _write(os.path.join(path, 'cgroup.subtree_control'), wanted)
+            return True
+        except OSError as e:
+            logger.warning(f'Cannot use cgroup {path} for terminal limits, falling back to rlimits: {e}')
+            return False
+
+    def create_cgroup(self, name):
+        """Create the cgroup for one session; returns its path, or None
+
+        ``name`` must be a single path component, so the cgroup is always a
+        direct child of ``cgroup_parent``.
+        """
+        if not name or name in ('.', '..') or '/' in name or '\0' in name:
+            raise ValueError(f'Invalid cgroup name: {name!r}')
+        if not self.cgroup_parent:
+            return None
+        path = os.path.join(self.cgroup_parent, name)
+        try:
+            os.makedirs(path, exist_ok=True)
+            if self.cpu_percent is not None:
+                quota = max(int(CPU_PERIOD_USEC * self.cpu_percent / 100), 1000)
+                _write(os.path.join(path, 'cpu.max'), f'{quota} {CPU_PERIOD_USEC}')
+            if self.memory_bytes is not None:
+                _write(os.path.join(path, 'memory.max'), str(self.memory_bytes))
+            if self.max_pids is not None:
+                _write(os.path.join(path, 'pids.max'), str(self.max_pids))
+            return path
+        except OSError as e:
+            logger.warning(f'Cannot create cgroup {path}: {e}')
+            return None
+
+    def preexec(self, cgroup_path=None):
+        """Return the preexec_fn for a shell: new session, then limits"""
+        def apply():
+            os.setsid()
+            if cgroup_path:
+                _write(os.path.join(cgroup_path, 'cgroup.procs'), '0')
+                return
+            if self.memory_bytes is not None:
+                resource.setrlimit(resource.RLIMIT_AS, (self.memory_bytes, self.memory_bytes))
+            if self.cpu_percent is not None:
+                os.nice(FALLBACK_NICE)
+        return apply
+
+    def release_cgroup(self, cgroup_path):
+        """Kill whatever is left in a session's cgroup and remove it"""
+        if not cgroup_path:
+            return
+        try:
+            _write(os.path.join(cgroup_path, 'cgroup.kill'), '1')
+        except OSError:
+            pass
+        self._remove_cgroup(cgroup_path, 5)
+
+    def _remove_cgroup(self, cgroup_path, attempts):
+        try:
+            os.rmdir(cgroup_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Processes are still exiting
+            if attempts > 1:
+                eventlet.spawn_after(0.5, self._remove_cgroup, cgroup_path, attempts - 1)
+            else:
+                logger.warning(f'Could not remove cgroup {cgroup_path}')
+
+    def _cgroup_usage(self, cgroup_path):
+        cpu_usec = 0
+        for line in _read(os.path.join(cgroup_path, 'cpu.stat')).splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'usage_usec':
+                cpu_usec = int(value)
+        return {
+            'cpu_time': cpu_usec / 1e6,
+            'memory': int(_read(os.path.join(cgroup_path, 'memory.current'))),
+            'processes': int(_read(os.path.join(cgroup_path, 'pids.current')))
+        }
+
+    def _proc_usage(self, session_ids):
+        """Sum CPU time and RSS of all processes per process session, in one /proc scan"""
+        usage = {sid: {'cpu_time': 0.0, 'memory': 0, 'processes': 0} for sid in session_ids}
+        for name in os.listdir('/proc'):
+            if not name.isdigit():
+                continue
+            try:
+                stat = _read(f'/proc/{name}/stat')
+            except OSError:
+                continue
+            # Fields after the command name, which may itself contain ') '
+            fields = stat[stat.rfind(')') + 2:].split()
+            entry = usage.get(int(fields[3]))
+            if entry is None:
+                continue
+            # Own user and system time plus that of children already reaped
+            entry['cpu_time'] += sum(int(v) for v in fields[11:15]) / self._clock_ticks
+            entry['memory'] += int(fields[21]) * self._page_size
+            entry['processes'] += 1
+        return usage
+
+    def usage(self, shells):
+        """Return {key: {'cpu_time', 'memory', 'processes'}} for {key: (pid, cgroup_path)}"""
+        result = {}
+        by_sid = {}
+        for key, (pid, cgroup_path) in shells.items():
+            if cgroup_path:
+                try:
+                    result[key] = self._cgroup_usage(cgroup_path)
+                    continue
+                except (OSError, ValueError):
+                    pass
+            if pid:
+                # The shell leads its own session (setsid)
+                by_sid[pid] = key
+        if by_sid:
+            try:
+                for sid, entry in self._proc_usage(by_sid).items():
+                    result[by_sid[sid]] = entry
+            except OSError as e:
+                logger.warning(f'Cannot read process usage: {e}')
+        return result
@@ -0,0 +1,168 @@
+import gzip
+import time
+import logging
+from flask import Response, jsonify
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: pip install zstandard
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: pip install msgpack
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent as they are; compressing them saves
+# less than the Content-Encoding header and the CPU time cost
+DEFAULT_MIN_SIZE = 1024
+# Bodies at least this large are compressed in a worker thread (the
+# compressors release the GIL) instead of holding up the hub
+OFFLOAD_SIZE = 256 * 1024
+# Fast levels: tree and listing JSON compresses well even at these
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/msgpack', 'application/vnd.msgpack')
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'application/javascript',
+                          'application/xml', 'image/svg+xml') + MSGPACK_MIMETYPES
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _zstd(data):
+    # Compressor objects are not thread safe, so each call gets its own
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def available_codecs():
+    """Content codings this process can produce, most preferred first"""
+    codecs = {}
+    if zstandard is not None:
+        codecs['zstd'] = _zstd
+    if brotli is not None:
+        codecs['br'] = _brotli
+    codecs['gzip'] = _gzip
+    return codecs
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+class ResponseCompressor:
+    """Compresses response bodies with the best coding the client accepts.
+
+    Of zstd, brotli and gzip, the first one both sides support wins (zstd and
+    brotli only when their packages are installed). Only complete 200
+    responses of text-like types and at least ``min_size`` bytes are
+    compressed; streamed, ranged and already encoded responses pass through
+    untouched. A strong ETag becomes weak on compressed responses, as the
+    bytes differ from the identity representation while the content is the
+    same.
+    """
+
+    def __init__(self, min_size=DEFAULT_MIN_SIZE, offload=None, offload_size=OFFLOAD_SIZE):
+        self.min_size = min_size
+        self.offload = offload  # offload(func, data) runs func(data) in a worker thread
+        self.offload_size = offload_size
+        self.codecs = available_codecs()
+        self.skipped = 0
+        self._stats = {name: [0, 0, 0, 0.0] for name in self.codecs}  # count, bytes in, bytes out, seconds
+
+    def choose(self, accept_encodings):
+        """Best content coding for an Accept-Encoding header, or None"""
+        return accept_encodings.best_match(list(self.codecs))
+
+    def compress_response(self, response, accept_encodings):
+        """Compress a Flask response in place if worthwhile; returns the response"""
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or 'Content-Range' in response.headers
+                or not is_compressible(response.mimetype)):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = self.choose(accept_encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            self.skipped += 1
+            return response
+
+        codec = self.codecs[encoding]
+        started = time.perf_counter()
+        try:
+            if self.offload is not None and len(data) >= self.offload_size:
+                compressed = self.offload(codec, data)
+            else:
+                compressed = codec(data)
+        except Exception as e:
+            logger.warning(f'{encoding} compression failed, sending identity: {e}')
+            return response
+        elapsed = time.perf_counter() - started
+        if len(compressed) >= len(data):
+            self.skipped += 1
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        entry = self._stats[encoding]
+        entry[0] += 1
+        entry[1] += len(data)
+        entry[2] += len(compressed)
+        entry[3] += elapsed
+        return response
+
+    def stats(self):
+        return {
+            'min_size': self.min_size,
+            'skipped': self.skipped,
+            'encodings': {
+                name: {
+                    'count': count,
+                    'bytes_in': bytes_in,
+                    'bytes_out': bytes_out,
+                    'ratio': round(bytes_out / bytes_in, 3) if bytes_in else None,
+                    'time': round(seconds, 3)
+                }
+                for name, (count, bytes_in, bytes_out, seconds) in self._stats.items()
+            },
+            'msgpack': msgpack is not None
+        }
+
+
+def prefers_msgpack(accept_mimetypes):
+    """True if the client ranks MessagePack above JSON and it can be produced"""
+    if msgpack is None:
+        return False
+    quality = max(accept_mimetypes.quality(m) for m in MSGPACK_MIMETYPES)
+    return quality > 0 and quality > accept_mimetypes.quality('application/json')
+
+
+def packed_response(data, accept_mimetypes):
+    """JSON response for ``data``, or MessagePack when the client asks for it"""
+    if prefers_msgpack(accept_mimetypes):
+        response = Response(msgpack.packb(data, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(data)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,54 @@
+DEFAULT_SCROLLBACK_BYTES = 256 * 1024
+
+
+class ScrollbackBuffer:
+    """Keeps the most recent ``capacity`` bytes of terminal output.
+
+    The bytearray grows as output arrives until it reaches the capacity,
+    after which it is used as a ring: new bytes overwrite the oldest ones
+    in place, so appending never reallocates or shifts data.
+    """
+
+    def __init__(self, capacity=DEFAULT_SCROLLBACK_BYTES):
+        self.capacity = capacity
+        self.total_written = 0
+        self._buffer = bytearray()
+        self._end = 0  # oldest byte (and next write) once the ring is full
+
+    def write(self, data):
+        data = memoryview(data)
+        size = len(data)
+        self.total_written += size
+        capacity = self.capacity
+        if size >= capacity:
+            self._buffer = bytearray(data[size - capacity:])
+            self._end = 0
+            return
+
+        if len(self._buffer) < capacity:
+            room = capacity - len(self._buffer)
+            self._buffer += data[:room]
+            data = data[room:]
+            self._end = 0
+            if not data:
+                return
+
+        first = min(len(data), capacity - self._end)
+        self._buffer[self._end:self._end + first] = data[:first]
+        rest = len(data) - first
+        if rest:
+            self._buffer[:rest] = data[first:]
+        self._end = (self._end + len(data)) % capacity
+
+    def getvalue(self):
+        """Return the buffered bytes, oldest first"""
+        if len(self._buffer) < self.capacity or not self._end:
+            return bytes(self._buffer)
+        return bytes(self._buffer[self._end:]) + bytes(self._buffer[:self._end])
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def clear(self):
+        self._buffer = bytearray()
+        self._end = 0
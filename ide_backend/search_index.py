@@ -0,0 +1,201 @@
+import os
+import re
+import logging
+import eventlet
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# Files larger than this, or binary files, are not indexed or searched
+MAX_INDEXED_FILE_SIZE = 1024 * 1024
+SNIFF_SIZE = 8192
+# Longest line excerpt returned with each match
+MAX_PREVIEW_LENGTH = 200
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _required_literals(pattern, flags):
+    """Return literal substrings every match of a regex must contain"""
+    literals = []
+    run = []
+    for op, av in sre_parse.parse(pattern, flags):
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            literals.append(''.join(run))
+            run = []
+    if run:
+        literals.append(''.join(run))
+    return literals
+
+
+class SearchIndex:
+    """Trigram inverted index over the text files of a workspace.
+
+    Files are taken from a FileTreeIndex, so the same excluded and hidden
+    folders are skipped, and the index follows its change events. A query
+    is narrowed to files containing all of its trigrams (case-folded)
+    before the candidates are scanned line by line.
+    """
+
+    def __init__(self, tree_index):
+        self.tree_index = tree_index
+        self.root = tree_index.root
+        self.built = False
+        self._build_thread = None
+        self._postings = {}  # trigram -> set of paths
+        self._file_trigrams = {}  # path -> frozenset of trigrams
+        tree_index.add_listener(self._on_tree_change)
+
+    def _read(self, rel_path):
+        """Return the text of an indexable file, or None"""
+        abs_path = os.path.join(self.root, rel_path)
+        try:
+            if os.path.getsize(abs_path) > MAX_INDEXED_FILE_SIZE:
+                return None
+            with open(abs_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b'\0' in data[:SNIFF_SIZE]:
+            return None
+        return data.decode('utf-8', errors='ignore')
+
+    def _add(self, rel_path):
+        self._remove(rel_path)
+        content = self._read(rel_path)
+        if content is None:
+            return
+        trigrams = frozenset(_trigrams(content.casefold()))
+        self._file_trigrams[rel_path] = trigrams
+        for trigram in trigrams:
+            self._postings.setdefault(trigram, set()).add(rel_path)
+
+    def _remove(self, rel_path):
+        trigrams = self._file_trigrams.pop(rel_path, None)
+        if not trigrams:
+            return
+        for trigram in trigrams:
+            paths = self._postings.get(trigram)
+            if paths is not None:
+                paths.discard(rel_path)
+                if not paths:
+                    del self._postings[trigram]
+
+    def _remove_tree(self, rel_dir):
+        prefix = rel_dir + os.sep
+        for path in [p for p in self._file_trigrams if p.startswith(prefix)]:
+            self._remove(path)
+
+    def build(self):
+        """Index every file in the workspace, yielding to other greenthreads"""
+        for count, rel_path in enumerate(list(self.tree_index.iter_files()), 1):
+            self._add(rel_path)
+            if count % 50 == 0:
+                eventlet.sleep(0)
+        self.built = True
+
+    def start_build(self):
+        """Build the index in a background greenthread"""
+        if not self.built and self._build_thread is None:
+            self._build_thread = eventlet.spawn(self.build)
+
+    def ensure_built(self):
+        if self.built:
+            return
+        if self._build_thread is not None:
+            self._build_thread.wait()
+        else:
+            self.build()
+
+    def stop(self):
+        self.tree_index.remove_listener(self._on_tree_change)
+        if self._build_thread is not None:
+            self._build_thread.kill()
+
+    def _on_tree_change(self, event):
+        # Changes during the initial build are applied too; re-adding a
+        # file the build reaches later is harmless
+        for change in event['changes']:
+            action = change['action']
+            path = change['path']
+            is_folder = change['type'] == 'folder'
+            if action in ('removed', 'renamed'):
+                if is_folder:
+                    self._remove_tree(path)
+                else:
+                    self._remove(path)
+            if action == 'renamed':
+                path = change['new_path']
+                if is_folder:
+                    # Entries of a renamed folder are not listed separately
+                    for rel_path in self.tree_index.iter_files(path):
+                        self._add(rel_path)
+                    continue
+            if action in ('added', 'modified', 'renamed') and not is_folder:
+                self._add(path)
+
+    def candidates(self, required):
+        """Return sorted paths that may contain all required substrings"""
+        trigrams = set()
+        for literal in required:
+            trigrams |= _trigrams(literal.casefold())
+        if not trigrams:
+            return sorted(self._file_trigrams)
+
+        paths = None
+        for trigram in sorted(trigrams, key=lambda t: len(self._postings.get(t, ()))):
+            postings = self._postings.get(trigram)
+            if not postings:
+                return []
+            paths = set(postings) if paths is None else paths & postings
+            if not paths:
+                return []
+        return sorted(paths)
+
+    def iter_matches(self, query, regex=False, case_sensitive=False):
+        """Yield matches as {'path', 'line', 'column', 'text'} dicts.
+
+        Raises re.error for an invalid regular expression.
+        """
+        self.tree_index.sync()
+        self.ensure_built()
+
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if regex:
+            pattern = re.compile(query, flags)
+            required = _required_literals(query, flags)
+        else:
+            pattern = re.compile(re.escape(query), flags)
+            required = [query]
+
+        for count, rel_path in enumerate(self.candidates(required), 1):
+            content = self._read(rel_path)
+            if content is None:
+                continue
+            for line_number, line in enumerate(content.splitlines(), 1):
+                match = pattern.search(line)
+                if match:
+                    yield {
+                        'path': rel_path,
+                        'line': line_number,
+                        'column': match.start() + 1,
+                        'text': line[:MAX_PREVIEW_LENGTH]
+                    }
+            if count % 20 == 0:
+                eventlet.sleep(0)
+
+    def stats(self):
+        return {
+            'built': self.built,
+            'files': len(self._file_trigrams),
+            'trigrams': len(self._postings)
+        }
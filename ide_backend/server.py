@@ -0,0 +1,197 @@
+"""Production entry point for the IDE backend.
+
+    python server.py [--host 0.0.0.0] [--port 5002] [--workers N]
+
+Runs the app on eventlet's WSGI server without the debugger or reloader.
+With more than one worker, this process only accepts connections and
+hands each one (the socket itself, over a Unix socket) to the worker
+chosen by hashing the client's IP address. A client therefore always
+reaches the same worker, which holds its terminals and Socket.IO session.
+Workers that die are restarted. Set IDE_MESSAGE_QUEUE (e.g.
+``redis://localhost:6379/0``) so events emitted by one worker reach
+clients connected to the others.
+"""
+import os
+import sys
+import zlib
+import errno
+import select
+import signal
+import socket
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+# Connections handed to a worker but not yet taken by it
+HANDOFF_BACKLOG = 128
+# Seconds to wait for a worker whose handoff queue is full
+HANDOFF_TIMEOUT = 1.0
+
+
+class HandoffListener:
+    """Listening-socket stand-in for eventlet.wsgi that yields handed-off connections"""
+
+    def __init__(self, channel, public_socket):
+        self.channel = channel
+        self.family = public_socket.family
+        self._sockname = public_socket.getsockname()
+
+    def getsockname(self):
+        return self._sockname
+
+    def accept(self):
+        from eventlet.greenio import GreenSocket
+        from eventlet.hubs import trampoline
+        while True:
+            trampoline(self.channel.fileno(), read=True)
+            try:
+                _, fds, _, _ = socket.recv_fds(self.channel, 1, 1)
+            except BlockingIOError:
+                continue
+            if not fds:
+                raise OSError(errno.EPIPE, 'Connection handoff channel closed')
+            client = GreenSocket(socket.socket(fileno=fds[0]))
+            try:
+                return client, client.getpeername()
+            except OSError:
+                # Client already went away
+                client.close()
+
+    def close(self):
+        self.channel.close()
+
+
+def serve(listener):
+    """Import the app in this process and serve it until SIGTERM"""
+    import eventlet.wsgi
+    from app import app, workspaces, terminal_manager
+
+    def shutdown(*args):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        eventlet.wsgi.server(listener, app, log_output=False)
+    finally:
+        workspaces.close_all()
+        terminal_manager.close_all_sessions()
+
+
+class Supervisor:
+    """Forks the workers, routes connections to them and restarts dead ones"""
+
+    def __init__(self, public_socket, workers):
+        self.public_socket = public_socket
+        self.workers = workers
+        self._channels = [None] * workers  # parent end of each worker's handoff socket
+        self._pids = {}  # pid -> worker index
+        self._stopping = False
+
+    def _spawn(self, index):
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        parent.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, HANDOFF_BACKLOG * 1024)
+        # A stuck worker must not hold up connections for the others
+        parent.settimeout(HANDOFF_TIMEOUT)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                parent.close()
+                for channel in self._channels:
+                    if channel is not None:
+                        channel.close()
+                os.environ['IDE_WORKER_ID'] = str(index)
+                child.setblocking(False)
+                listener = HandoffListener(child, self.public_socket)
+                self.public_socket.close()
+                serve(listener)
+            except BaseException as e:
+                if not isinstance(e, SystemExit):
+                    logger.exception(f'Worker {index} failed: {e}')
+            finally:
+                os._exit(0)
+        child.close()
+        if self._channels[index] is not None:
+            self._channels[index].close()
+        self._channels[index] = parent
+        self._pids[pid] = index
+        logger.info(f'Started worker {index} (pid {pid})')
+
+    def _reap(self):
+        while self._pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = self._pids.pop(pid, None)
+            if index is not None and not self._stopping:
+                logger.warning(f'Worker {index} (pid {pid}) exited with status {status}; restarting it')
+                self._spawn(index)
+
+    def _route(self, client, address):
+        # Same client address -> same worker, so terminals and polling
+        # requests always reach the process that owns them
+        host = address[0] if isinstance(address, tuple) else str(address)
+        index = zlib.crc32(host.encode()) % self.workers
+        try:
+            socket.send_fds(self._channels[index], [b'c'], [client.fileno()])
+        except OSError as e:
+            logger.warning(f'Could not hand connection from {host} to worker {index}: {e}')
+        finally:
+            client.close()
+
+    def stop(self, *args):
+        self._stopping = True
+        for pid in list(self._pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        for index in range(self.workers):
+            self._spawn(index)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self._stopping:
+            try:
+                readable, _, _ = select.select([self.public_socket], [], [], 1.0)
+                if readable:
+                    self._route(*self.public_socket.accept())
+            except InterruptedError:
+                pass
+            except OSError as e:
+                logger.warning(f'Error accepting connection: {e}')
+            self._reap()
+        for pid in list(self._pids):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the IDE backend in production mode')
+    parser.add_argument('--host', default=os.environ.get('IDE_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('IDE_PORT', '5002')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('IDE_WORKERS', '1')))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.workers <= 1:
+        import eventlet
+        serve(eventlet.listen((args.host, args.port)))
+        return
+
+    if not os.environ.get('IDE_MESSAGE_QUEUE'):
+        logger.warning('IDE_WORKERS > 1 without IDE_MESSAGE_QUEUE: events are only delivered '
+                       'to clients of the worker that emits them')
+    public_socket = socket.create_server((args.host, args.port), backlog=HANDOFF_BACKLOG)
+    logger.info(f'IDE backend listening on {args.host}:{args.port} with {args.workers} workers')
+    Supervisor(public_socket, args.workers).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import logging
+from collections import OrderedDict, deque
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 2
+# Working directories that keep warm shells at the same time
+MAX_POOLED_DIRS = 4
+
+
+class ShellPool:
+    """Keeps pre-started shells ready to be handed out as terminal sessions.
+
+    ``factory(working_dir, venv_path)`` starts a detached TerminalSession
+    (or returns None). Shells are pooled per (working_dir, venv_path);
+    taking one refills that pool in a background greenthread, so opening
+    a terminal never waits for bash to start. Only the most recently used
+    ``max_keys`` directories keep warm shells.
+    """
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, max_keys=MAX_POOLED_DIRS):
+        self.factory = factory
+        self.size = size
+        self.max_keys = max_keys
+        self.hits = 0
+        self.misses = 0
+        self._idle = OrderedDict()  # (working_dir, venv_path) -> deque of sessions
+        self._filling = set()
+
+    def warm(self, working_dir, venv_path=None):
+        """Start filling the pool for a directory in the background"""
+        key = (working_dir, venv_path)
+        if key not in self._idle:
+            self._idle[key] = deque()
+            while len(self._idle) > self.max_keys:
+                _, sessions = self._idle.popitem(last=False)
+                for session in sessions:
+                    session.stop()
+        self._idle.move_to_end(key)
+        if key not in self._filling:
+            self._filling.add(key)
+            eventlet.spawn(self._fill, key)
+
+    def _fill(self, key):
+        try:
+            while key in self._idle and len(self._idle[key]) < self.size:
+                session = self.factory(*key)
+                if session is None:
+                    break
+                if key in self._idle:
+                    self._idle[key].append(session)
+                else:
+                    # Evicted while the shell was starting
+                    session.stop()
+                eventlet.sleep(0)
+        except Exception as e:
+            logger.error(f'Error filling shell pool for {key[0]}: {e}')
+        finally:
+            self._filling.discard(key)
+
+    def acquire(self, working_dir, venv_path=None):
+        """Take a warm shell, or None if there is none yet"""
+        sessions = self._idle.get((working_dir, venv_path))
+        session = None
+        while sessions:
+            candidate = sessions.popleft()
+            if candidate.running:
+                session = candidate
+                break
+            candidate.stop()
+
+        if session:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.warm(working_dir, venv_path)
+        return session
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'idle': sum(len(sessions) for sessions in self._idle.values()),
+            'directories': len(self._idle),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self):
+        """Stop every idle shell"""
+        for sessions in self._idle.values():
+            for session in sessions:
+                session.stop()
+        self._idle.clear()
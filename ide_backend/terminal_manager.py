@@ -1,60 +1,109 @@
 import os
 import pty
-import select
 import subprocess
 import eventlet
 import fcntl
 import struct
 import termios
+import time
+import hmac
+import codecs
+import secrets
+import logging
+from functools import partial
 from datetime import datetime
+from pty_reactor import PtyReactor
+from scrollback import ScrollbackBuffer
+from shell_pool import ShellPool
+from venv_resolver import VenvResolver
+from resource_limits import ResourceLimits
+
+logger = logging.getLogger(__name__)
+
+# PTY reads start small and double while the shell fills them, up to the max
+MIN_READ_SIZE = 4096
+MAX_READ_SIZE = 64 * 1024
+# Output is emitted at most once per interval, or as soon as this much is
+# pending; this is also the most read from one PTY per reactor wakeup
+OUTPUT_FLUSH_INTERVAL = 0.005
+OUTPUT_FLUSH_SIZE = 64 * 1024
+# With flow control, reading pauses once this many emitted bytes are not yet
+# acknowledged by the client, and resumes below the low-water mark
+FLOW_HIGH_WATER = 256 * 1024
+FLOW_LOW_WATER = 64 * 1024
+# Seconds between sampled debug logs of per-session output counters
+STATS_LOG_INTERVAL = 30
+
+# Prompts; the venv one shows the venv name in front
+SHELL_PS1 = '\\[\\033[01;32m\\]\\u@\\h\\[\\033[00m\\]:\\[\\033[01;34m\\]\\w\\[\\033[00m\\]\\$ '
+VENV_PS1_PREFIX = '\\[\\033[01;32m\\]({})\\[\\033[00m\\] '
+
+
+def shell_base_env():
+    """Environment shared by every shell, before the per-session prompt"""
+    env = os.environ.copy()
+    env['TERM'] = 'xterm-256color'
+    return env
+
 
 class TerminalSession:
     """Manages a single PTY terminal session"""
 
-    def __init__(self, session_id, working_dir, socket_io, client_sid, namespace='/', venv_path=None):
+    def __init__(self, session_id, working_dir, socket_io, client_sid, namespace='/', venv_path=None,
+                 reactor=None, flow_control=False, binary=False, venv_resolver=None, base_env=None,
+                 limits=None):
         self.session_id = session_id
         self.working_dir = working_dir
         self.socket_io = socket_io
         self.client_sid = client_sid  # Store the client's socket ID
         self.namespace = namespace
         self.venv_path = venv_path  # Optional: explicitly provided venv path
+        self.venv_resolver = venv_resolver or VenvResolver(self._backend_dirs())
+        self.base_env = base_env
+        # Optional ResourceLimits applied to the shell and everything it starts
+        self.limits = limits
+        # Named by the server: session ids come from the client and may repeat
+        self.cgroup_name = f'term-{secrets.token_hex(16)}'
+        self.cgroup = None
         self.master_fd = None
+        self.pid_fd = None
         self.process = None
-        self.thread = None
+        self.reactor = reactor or PtyReactor()
         self.running = False
+        # Output coalescing and flow control state
+        self.flow_control = flow_control
+        # Binary sessions emit raw bytes; text sessions decode incrementally
+        # so multibyte characters split across reads are kept intact
+        self.binary = binary
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        # Recent output, replayed when a client reattaches; the token proves
+        # the reattaching client is the one that created the session
+        self.scrollback = ScrollbackBuffer()
+        self.reattach_token = secrets.token_urlsafe(16)
+        self.detached = False
+        self._read_size = MIN_READ_SIZE
+        self._pending = []
+        self._pending_size = 0
+        self._flush_timer = None
+        self._last_flush = 0
+        self._unacked = 0
+        self._paused = False
+        self.started_at = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_out = 0
+        self.pauses = 0
+        self._last_stats_log = time.monotonic()
+
+    @staticmethod
+    def _backend_dirs():
+        """Folders whose venv is preferred: the repo's ide_backend folder and this one"""
+        current_file_dir = os.path.dirname(os.path.abspath(__file__))
+        return (os.path.join(os.path.dirname(current_file_dir), 'ide_backend'), current_file_dir)
 
     def _find_venv(self, directory):
         """Find virtual environment in directory or parent directories"""
-        # First, check for ide_backend venv (project-specific venv)
-        ide_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        ide_backend_venv = os.path.join(ide_backend_dir, 'ide_backend', 'venv')
-        if os.path.exists(os.path.join(ide_backend_venv, 'bin', 'activate')):
-            return ide_backend_venv
-        
-        # Also check in ide_backend directory itself (if running from there)
-        current_file_dir = os.path.dirname(os.path.abspath(__file__))
-        venv_in_backend = os.path.join(current_file_dir, 'venv')
-        if os.path.exists(os.path.join(venv_in_backend, 'bin', 'activate')):
-            return venv_in_backend
-        
-        # Fallback: check standard venv locations in workspace
-        venv_paths = ['venv', '.venv', 'env', '.env', 'virtualenv']
-        current_dir = os.path.abspath(directory) if directory else os.getcwd()
-        
-        # Check current directory and parent directories (up to 3 levels up)
-        for _ in range(4):
-            for venv_name in venv_paths:
-                venv_path = os.path.join(current_dir, venv_name)
-                activate_script = os.path.join(venv_path, 'bin', 'activate')
-                if os.path.exists(activate_script):
-                    return venv_path
-            # Move to parent directory
-            parent_dir = os.path.dirname(current_dir)
-            if parent_dir == current_dir:  # Reached root
-                break
-            current_dir = parent_dir
-        
-        return None
+        return self.venv_resolver.find(directory)
 
     def start(self):
         """Start the PTY terminal session"""
@@ -73,17 +122,21 @@ class TerminalSession:
                 venv_path = self._find_venv(self.working_dir)
             
             # Start shell process
-            env = os.environ.copy()
-            env['TERM'] = 'xterm-256color'
-            
+            env = dict(self.base_env) if self.base_env is not None else shell_base_env()
+
             # Enhanced PS1 that shows venv status
             if venv_path:
-                venv_name = os.path.basename(venv_path)
-                env['PS1'] = f'\\[\\033[01;32m\\]({venv_name})\\[\\033[00m\\] \\[\\033[01;32m\\]\\u@\\h\\[\\033[00m\\]:\\[\\033[01;34m\\]\\w\\[\\033[00m\\]\\$ '
+                env['PS1'] = VENV_PS1_PREFIX.format(os.path.basename(venv_path)) + SHELL_PS1
                 # Store venv path for later activation
                 env['IDE_VENV_PATH'] = venv_path
             else:
-                env['PS1'] = '\\[\\033[01;32m\\]\\u@\\h\\[\\033[00m\\]:\\[\\033[01;34m\\]\\w\\[\\033[00m\\]\\$ '
+                env['PS1'] = SHELL_PS1
+
+            if self.limits:
+                self.cgroup = self.limits.create_cgroup(self.cgroup_name)
+                preexec_fn = self.limits.preexec(self.cgroup)
+            else:
+                preexec_fn = os.setsid
 
             self.process = subprocess.Popen(
                 ['/bin/bash'],
@@ -92,8 +145,9 @@ class TerminalSession:
                 stderr=slave_fd,
                 env=env,
                 cwd=self.working_dir,
-                preexec_fn=os.setsid
+                preexec_fn=preexec_fn
             )
+            self.started_at = time.time()
 
             # Close slave fd in parent process
             os.close(slave_fd)
@@ -102,9 +156,15 @@ class TerminalSession:
             flags = fcntl.fcntl(self.master_fd, fcntl.F_GETFL)
             fcntl.fcntl(self.master_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
 
-            # Start reading greenthread (eventlet compatible)
+            # Output and child exit are dispatched by the shared reactor
             self.running = True
-            self.thread = eventlet.spawn(self._read_output)
+            self.reactor.register(self.master_fd, self._read_output)
+            try:
+                self.pid_fd = os.pidfd_open(self.process.pid)
+                self.reactor.register(self.pid_fd, self._on_exit)
+            except (AttributeError, OSError):
+                # No pidfd support: exit shows up as EOF on the PTY instead
+                self.pid_fd = None
             
             # If venv found, activate it by writing to the terminal after a short delay
             # This allows bash to fully initialize before we send the activation command
@@ -120,7 +180,7 @@ class TerminalSession:
 
             return True
         except Exception as e:
-            print(f"Error starting terminal session: {e}")
+            logger.error(f'Error starting terminal session {self.session_id}: {e}')
             return False
 
     def _set_terminal_size(self, cols, rows):
@@ -130,55 +190,166 @@ class TerminalSession:
             fcntl.ioctl(self.master_fd, termios.TIOCSWINSZ, size)
 
     def _read_output(self):
-        """Read output from the PTY and send to client"""
-        while self.running:
+        """Read available PTY output; returns the number of bytes read.
+
+        Output is buffered and emitted by ``_flush_output``: right away if
+        nothing was sent during the last interval (so keystroke echo is not
+        delayed), otherwise when the interval ends or enough is pending.
+        """
+        total = 0
+        eof = False
+        while total < OUTPUT_FLUSH_SIZE:
             try:
-                # Use eventlet-friendly select
-                r, _, _ = eventlet.green.select.select([self.master_fd], [], [], 0.1)
-
-                if r:
-                    try:
-                        data = os.read(self.master_fd, 1024)
-                        if data:
-                            output = data.decode('utf-8', errors='replace')
-                            print(f"[Terminal {self.session_id}] Read output: {repr(output)}")
-                            # Send output to specific client via WebSocket
-                            # Use 'to=' parameter for Flask-SocketIO room targeting
-                            self.socket_io.emit('terminal_output', {
-                                'session_id': self.session_id,
-                                'data': output
-                            }, to=self.client_sid)
-                            print(f"[Terminal {self.session_id}] Emitted output to client {self.client_sid}")
-                    except OSError as e:
-                        # Process might have exited
-                        print(f"[Terminal {self.session_id}] OSError reading output: {e}")
-                        break
-                else:
-                    # Yield to other greenthreads when no data
-                    eventlet.sleep(0)
-
-                # Check if process is still running
-                if self.process and self.process.poll() is not None:
-                    self.running = False
-                    break
-
-            except Exception as e:
-                print(f"Error reading terminal output: {e}")
+                data = os.read(self.master_fd, self._read_size)
+            except BlockingIOError:
                 break
-
-        self._cleanup()
+            except OSError:
+                # EIO once the shell and everything else holding the PTY exit
+                eof = True
+                break
+            if not data:
+                eof = True
+                break
+            if len(data) == self._read_size:
+                self._read_size = min(self._read_size * 2, MAX_READ_SIZE)
+            elif len(data) < self._read_size // 4:
+                self._read_size = max(self._read_size // 2, MIN_READ_SIZE)
+            self.scrollback.write(data)
+            self._pending.append(data)
+            self._pending_size += len(data)
+            total += len(data)
+
+        if eof or self._pending_size >= OUTPUT_FLUSH_SIZE:
+            self._flush_output()
+        elif self._pending and self._flush_timer is None:
+            delay = self._last_flush + OUTPUT_FLUSH_INTERVAL - time.monotonic()
+            if delay <= 0:
+                self._flush_output()
+            else:
+                self._flush_timer = eventlet.spawn_after(delay, self._flush_output)
+        if eof:
+            self._cleanup()
+        return total
+
+    def _flush_output(self, final=False):
+        """Emit all buffered output as one terminal_output message.
+
+        ``final`` also flushes an incomplete character held by the decoder.
+        """
+        timer, self._flush_timer = self._flush_timer, None
+        if timer is not None and timer is not eventlet.getcurrent():
+            timer.cancel()
+        if not self._pending and (self.binary or not final):
+            return
+        if self.detached:
+            # Nobody to send to; the output is kept in the scrollback
+            self._pending = []
+            self._pending_size = 0
+            return
+
+        data = b''.join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+        output = data if self.binary else self._decoder.decode(data, final)
+        if not output:
+            # Only part of a character so far; the decoder keeps it
+            return
+        payload = {
+            'session_id': self.session_id,
+            'data': output
+        }
+        # Send output to specific client via WebSocket
+        # Use 'to=' parameter for Flask-SocketIO room targeting. The client
+        # is always connected to this process, so skip any message queue.
+        if self.flow_control:
+            self._unacked += len(data)
+            self.socket_io.emit('terminal_output', payload, to=self.client_sid, ignore_queue=True,
+                                callback=partial(self._on_ack, len(data)))
+            if self._unacked >= FLOW_HIGH_WATER:
+                self._pause_reading()
+        else:
+            self.socket_io.emit('terminal_output', payload, to=self.client_sid, ignore_queue=True)
+
+        self.bytes_out += len(data)
+        self.frames_out += 1
+        if self._last_flush - self._last_stats_log >= STATS_LOG_INTERVAL:
+            self._last_stats_log = self._last_flush
+            logger.debug(f'Terminal {self.session_id}: {self.bytes_out} bytes in {self.frames_out} frames, '
+                         f'{self.pauses} pauses, read size {self._read_size}')
+
+    def _pause_reading(self):
+        """Stop reading the PTY until the client catches up.
+
+        The kernel PTY buffer then fills and blocks the writing process,
+        so a fast producer is slowed down instead of queueing output here.
+        """
+        if not self._paused and self.master_fd is not None:
+            self._paused = True
+            self.pauses += 1
+            self.reactor.unregister(self.master_fd)
+
+    def _on_ack(self, size, *args):
+        self._unacked = max(self._unacked - size, 0)
+        if self._unacked <= FLOW_LOW_WATER:
+            self._resume_reading()
+
+    def _resume_reading(self):
+        if self._paused and self.master_fd is not None:
+            self._paused = False
+            self.reactor.register(self.master_fd, self._read_output)
+
+    def detach(self):
+        """Keep running without a client; output only goes to the scrollback"""
+        self.detached = True
+        self._pending = []
+        self._pending_size = 0
+        # Acks from the old client will never come
+        self._unacked = 0
+        self._resume_reading()
+
+    def attach(self, client_sid, flow_control=False, binary=False, queue_replay=False):
+        """Bind the session to a (new) client and return the scrollback to replay.
+
+        With ``queue_replay`` the scrollback is also queued as the first
+        terminal_output, ahead of any output read after this call, and goes
+        out with the next flush.
+        """
+        self._flush_output()
+        self.client_sid = client_sid
+        self.flow_control = flow_control
+        self.binary = binary
+        self._decoder.reset()
+        self._unacked = 0
+        self._resume_reading()
+        self.detached = False
+        replay = self.scrollback.getvalue()
+        # The ring may start in the middle of a UTF-8 character
+        start = 0
+        while start < min(3, len(replay)) and 0x80 <= replay[start] < 0xC0:
+            start += 1
+        replay = replay[start:]
+        if queue_replay and replay:
+            self._pending = [replay]
+            self._pending_size = len(replay)
+        return replay
+
+    def _on_exit(self):
+        """The shell exited (pidfd readable): flush remaining output and clean up"""
+        while self.master_fd is not None and self._read_output():
+            pass
+        if self.running:
+            self._cleanup()
 
     def write_input(self, data):
-        """Write input to the PTY"""
+        """Write input (text, or raw bytes from a binary frame) to the PTY"""
         if self.master_fd and self.running:
             try:
-                print(f"[Terminal {self.session_id}] Writing input: {repr(data)}")
-                os.write(self.master_fd, data.encode('utf-8'))
-                print(f"[Terminal {self.session_id}] Input written successfully")
+                self.bytes_in += os.write(self.master_fd, data if isinstance(data, bytes) else data.encode('utf-8'))
             except Exception as e:
-                print(f"Error writing to terminal: {e}")
+                logger.warning(f'Error writing to terminal {self.session_id}: {e}')
         else:
-            print(f"[Terminal {self.session_id}] Cannot write - master_fd={self.master_fd}, running={self.running}")
+            logger.warning(f'Cannot write to terminal {self.session_id}: session is not running')
 
     def resize(self, cols, rows):
         """Resize the terminal"""
@@ -187,14 +358,21 @@ class TerminalSession:
     def _cleanup(self):
         """Clean up resources"""
         self.running = False
+        self._flush_output(final=True)
 
-        if self.master_fd:
+        if self.master_fd is not None:
+            self.reactor.unregister(self.master_fd)
             try:
                 os.close(self.master_fd)
             except:
                 pass
             self.master_fd = None
 
+        if self.pid_fd is not None:
+            self.reactor.unregister(self.pid_fd)
+            os.close(self.pid_fd)
+            self.pid_fd = None
+
         if self.process:
             try:
                 self.process.terminate()
@@ -206,19 +384,34 @@ class TerminalSession:
                     pass
             self.process = None
 
+        if self.cgroup:
+            self.limits.release_cgroup(self.cgroup)
+            self.cgroup = None
+
+    def stats(self):
+        """Counters for /api/terminals/stats (process usage is added by the manager)"""
+        return {
+            'session_id': self.session_id,
+            'pid': self.process.pid if self.process else None,
+            'running': self.running,
+            'detached': self.detached,
+            'started_at': self.started_at,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'frames_out': self.frames_out,
+            'pauses': self.pauses,
+            'scrollback_bytes': len(self.scrollback)
+        }
+
     def stop(self):
         """Stop the terminal session"""
-        self.running = False
-        if self.thread:
-            # Kill the eventlet greenthread
-            self.thread.kill()
         self._cleanup()
 
 
 class TerminalManager:
     """Manages multiple terminal sessions"""
 
-    def __init__(self, socket_io, default_working_dir=None, default_venv_path=None):
+    def __init__(self, socket_io, default_working_dir=None, default_venv_path=None, pool_size=0, limits=None):
         self.socket_io = socket_io
         self.sessions = {}
         # Use provided working directory or fallback to home directory
@@ -228,8 +421,32 @@ class TerminalManager:
             self.default_working_dir = os.path.expanduser('~')
         # Store default venv path
         self.default_venv_path = default_venv_path
-
-    def create_session(self, session_id=None, working_dir=None, client_sid=None):
+        # One reactor serves the output and exit events of every session
+        self.reactor = PtyReactor()
+        # Computed once and shared, so starting a shell does not probe the
+        # filesystem for venvs or copy os.environ again
+        self.venv_resolver = VenvResolver(TerminalSession._backend_dirs())
+        self.base_env = shell_base_env()
+        # Without configured limits this still accounts for process usage
+        self.limits = limits or ResourceLimits()
+        # session_id -> timer closing a detached session after its grace period
+        self._expiry_timers = {}
+        # Pre-started shells handed out by create_session
+        self.shell_pool = None
+        if pool_size > 0:
+            self.shell_pool = ShellPool(self._start_pooled_session, pool_size)
+            self.shell_pool.warm(self.default_working_dir, self.default_venv_path)
+
+    def _start_pooled_session(self, working_dir, venv_path):
+        """Start a shell with no client yet; its output waits in the scrollback"""
+        session = TerminalSession(f'pool_{secrets.token_hex(4)}', working_dir, self.socket_io, None,
+                                  venv_path=venv_path, reactor=self.reactor, venv_resolver=self.venv_resolver,
+                                  base_env=self.base_env, limits=self.limits)
+        session.detached = True
+        return session if session.start() else None
+
+    def create_session(self, session_id=None, working_dir=None, client_sid=None, flow_control=False,
+                       binary=False):
         """Create a new terminal session"""
         if session_id is None:
             session_id = f"term_{len(self.sessions)}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
@@ -243,7 +460,21 @@ class TerminalManager:
 
         # Use default venv path if available
         venv_path = self.default_venv_path
-        session = TerminalSession(session_id, working_dir, self.socket_io, client_sid, venv_path=venv_path)
+
+        session = self.shell_pool.acquire(working_dir, venv_path) if self.shell_pool else None
+        if session:
+            session.session_id = session_id
+            # The prompt the shell printed while it was waiting is queued
+            # before any new output, and sent after the caller has announced
+            # the new session
+            session.attach(client_sid, flow_control, binary, queue_replay=True)
+            self.sessions[session_id] = session
+            eventlet.spawn(session._flush_output)
+            return session_id
+
+        session = TerminalSession(session_id, working_dir, self.socket_io, client_sid, venv_path=venv_path,
+                                  reactor=self.reactor, flow_control=flow_control, binary=binary,
+                                  venv_resolver=self.venv_resolver, base_env=self.base_env, limits=self.limits)
 
         if session.start():
             self.sessions[session_id] = session
@@ -271,16 +502,73 @@ class TerminalManager:
             return True
         return False
 
+    def detach_session(self, session_id, grace_period, on_expire=None):
+        """Keep a session running without a client for grace_period seconds.
+
+        If nobody reattaches in time the session is closed and
+        ``on_expire()`` is called.
+        """
+        session = self.get_session(session_id)
+        if not session:
+            return False
+        session.detach()
+        self._cancel_expiry(session_id)
+        self._expiry_timers[session_id] = eventlet.spawn_after(
+            grace_period, self._expire_session, session_id, on_expire)
+        return True
+
+    def _expire_session(self, session_id, on_expire):
+        self._expiry_timers.pop(session_id, None)
+        session = self.get_session(session_id)
+        if session and session.detached:
+            logger.info(f'Closing detached terminal session {session_id} after grace period')
+            self.close_session(session_id)
+            if on_expire:
+                on_expire()
+
+    def _cancel_expiry(self, session_id):
+        timer = self._expiry_timers.pop(session_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def reattach_session(self, session_id, token, client_sid, flow_control=False, binary=False):
+        """Rebind a session to a new client; returns the scrollback bytes, or None"""
+        session = self.get_session(session_id)
+        if not session or not session.running or not token or \
+                not hmac.compare_digest(session.reattach_token, token):
+            return None
+        self._cancel_expiry(session_id)
+        return session.attach(client_sid, flow_control, binary)
+
     def close_session(self, session_id):
         """Close a terminal session"""
+        self._cancel_expiry(session_id)
         session = self.sessions.pop(session_id, None)
         if session:
             session.stop()
             return True
         return False
 
+    def get_stats(self):
+        """Per-session I/O counters and process usage (CPU seconds, memory, process count)"""
+        sessions = [session.stats() for session in self.sessions.values()]
+        usage = self.limits.usage({s.session_id: (s.process.pid if s.process else None, s.cgroup)
+                                   for s in self.sessions.values()})
+        for entry in sessions:
+            entry.update(usage.get(entry['session_id'], {}))
+        return {
+            'sessions': sessions,
+            'registered_fds': self.reactor.count(),
+            'pool': self.shell_pool.stats() if self.shell_pool else None,
+            'limits': self.limits.describe()
+        }
+
     def close_all_sessions(self):
         """Close all terminal sessions"""
+        for session_id in list(self._expiry_timers):
+            self._cancel_expiry(session_id)
         for session in list(self.sessions.values()):
             session.stop()
         self.sessions.clear()
+        if self.shell_pool:
+            self.shell_pool.close()
@@ -0,0 +1,80 @@
+import os
+import sys
+import importlib
+import eventlet
+import pytest
+
+
+@pytest.fixture(scope='module')
+def worker_app():
+    """The app as started by server.py for a worker other than the first"""
+    os.environ.update({
+        'IDE_MESSAGE_QUEUE': 'local://',
+        'IDE_WORKER_ID': '1',
+        'IDE_TERMINAL_POOL_SIZE': '0',
+        'IDE_WORKSPACE_IDLE_TIMEOUT': '0'
+    })
+    sys.modules.pop('app', None)
+    app = importlib.import_module('app')
+    yield app
+    app.workspaces.close_all()
+    app.terminal_manager.close_all_sessions()
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, **kwargs):
+        self.emitted.append((event, data, kwargs))
+
+
+def test_non_default_workspace_publishes_fs_changed(worker_app, tmp_path, monkeypatch):
+    recorder = RecordingSocketIO()
+    monkeypatch.setattr(worker_app.file_event_broadcaster, 'socket_io', recorder)
+    client = worker_app.app.test_client()
+    opened = client.post('/api/workspace', json={'workspace_path': str(tmp_path)}).json
+    assert opened['workspace_id'] != worker_app.workspaces.default.id
+
+    (tmp_path / 'created.txt').write_text('x')
+    for _ in range(100):
+        if recorder.emitted:
+            break
+        eventlet.sleep(0.05)
+
+    event, batch, kwargs = recorder.emitted[0]
+    assert event == 'fs_changed'
+    assert kwargs['to'] == worker_app.file_events_room(opened['workspace_id'])
+    # Delivered to this worker's own clients, not fanned out by the queue
+    assert kwargs['ignore_queue'] is True
+    assert [change['path'] for change in batch['changes']] == ['created.txt']
+
+
+def test_tree_etag_depends_on_path_and_depth(worker_app, tmp_path):
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'node_modules' / 'pkg').mkdir(parents=True)
+    client = worker_app.app.test_client()
+    workspace_id = client.post('/api/workspace', json={'workspace_path': str(tmp_path)}).json['workspace_id']
+    headers = {'X-Workspace-Id': workspace_id}
+
+    root = client.get('/api/files/tree', headers=headers)
+    etag = root.headers['ETag']
+    assert client.get('/api/files/tree', headers={**headers, 'If-None-Match': etag}).status_code == 304
+    for query in ('?path=nonexist', '?path=src', '?max_depth=1'):
+        response = client.get(f'/api/files/tree{query}', headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+
+    # Ignored folders are walked, and changes in them do not bump the version
+    ignored = client.get('/api/files/tree?path=node_modules', headers=headers)
+    assert 'ETag' not in ignored.headers
+    version = ignored.headers['X-Tree-Version']
+    response = client.get(f'/api/files/tree?path=node_modules&version={version}', headers=headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('body', [[1], 'x', None])
+def test_batch_rejects_bodies_that_are_not_objects(worker_app, body):
+    client = worker_app.app.test_client()
+    response = client.post('/api/files/batch', json=body) if body is not None else \
+        client.post('/api/files/batch', data='not json', content_type='application/json')
+    assert response.status_code == 400
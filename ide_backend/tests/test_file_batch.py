@@ -0,0 +1,56 @@
+import pytest
+from file_manager import FileManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = FileManager(workspace_root=str(tmp_path), watch=False)
+    yield manager
+    manager.close()
+
+
+def test_rollback_moves_renamed_entry_back_in_subfolder(manager, tmp_path):
+    (tmp_path / 'src' / 'pkg').mkdir(parents=True)
+    (tmp_path / 'src' / 'pkg' / 'old.py').write_text('code')
+
+    result = manager.batch([
+        {'op': 'rename', 'path': 'src/pkg/old.py', 'new_name': 'new.py'},
+        {'op': 'delete', 'path': 'src/missing.py'}
+    ], transactional=True)
+
+    assert result['rolled_back']
+    assert (tmp_path / 'src' / 'pkg' / 'old.py').read_text() == 'code'
+    assert not (tmp_path / 'src' / 'pkg' / 'new.py').exists()
+    assert not (tmp_path / 'old.py').exists()
+
+
+def test_rollback_moves_entry_back_out_of_subfolder(manager, tmp_path):
+    (tmp_path / 'src' / 'pkg').mkdir(parents=True)
+    (tmp_path / 'src' / 'old.py').write_text('code')
+
+    result = manager.batch([
+        {'op': 'rename', 'path': 'src/old.py', 'new_name': 'pkg/new.py'},
+        {'op': 'delete', 'path': 'src/missing.py'}
+    ], transactional=True)
+
+    assert result['rolled_back']
+    assert (tmp_path / 'src' / 'old.py').read_text() == 'code'
+    assert sorted(p.name for p in (tmp_path / 'src' / 'pkg').iterdir()) == []
+
+
+@pytest.mark.parametrize('operations', [['x'], [1], [{'op': 'mkdir', 'path': 'a'}, None]])
+def test_non_object_operations_are_rejected(manager, tmp_path, operations):
+    assert manager.batch(operations, transactional=True) == {'error': 'operations must be objects'}
+    assert not (tmp_path / 'a').exists()
+
+
+def test_transactional_write_keeps_mode_bits(manager, tmp_path):
+    script = tmp_path / 'run.sh'
+    script.write_text('#!/bin/sh\n')
+    script.chmod(0o755)
+
+    result = manager.batch([{'op': 'write', 'path': 'run.sh', 'content': '#!/bin/sh\necho hi\n'}], transactional=True)
+
+    assert result['success']
+    assert script.read_text() == '#!/bin/sh\necho hi\n'
+    assert script.stat().st_mode & 0o777 == 0o755
@@ -0,0 +1,74 @@
+import os
+import shutil
+import eventlet
+import pytest
+from file_manager import FileManager
+
+
+@pytest.fixture
+def write_behind_manager(tmp_path):
+    manager = FileManager(workspace_root=str(tmp_path), watch=False, write_behind_delay=0.05)
+    yield manager
+    manager.close()
+
+
+@pytest.mark.parametrize('background', [True, False])
+def test_clear_workspace_drops_queued_saves(write_behind_manager, tmp_path, background):
+    (tmp_path / 'notes.txt').write_text('v1')
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'app.py').write_text('v1')
+    assert write_behind_manager.write_file('notes.txt', 'v2')['queued']
+    assert write_behind_manager.write_file('src/app.py', 'v2')['queued']
+
+    write_behind_manager.clear_workspace(background)
+    assert write_behind_manager.flush_writes() == {'success': True}
+    eventlet.sleep(0.1)
+
+    assert [name for name in os.listdir(tmp_path) if not name.startswith('.')] == []
+
+
+def test_clear_workspace_keeps_queued_saves_of_hidden_files(write_behind_manager, tmp_path):
+    (tmp_path / '.gitignore').write_text('v1')
+    assert write_behind_manager.write_file('.gitignore', 'v2')['queued']
+
+    write_behind_manager.clear_workspace()
+    write_behind_manager.flush_writes()
+
+    assert (tmp_path / '.gitignore').read_text() == 'v2'
+
+
+def test_create_file_writes_in_a_worker_thread(tmp_path):
+    manager = FileManager(workspace_root=str(tmp_path), watch=False)
+    calls = []
+    run = manager.io.run
+    manager.io.run = lambda name, *args, **kwargs: calls.append(name) or run(name, *args, **kwargs)
+    try:
+        assert manager.create_file('src/new.py', 'code') == {'success': True, 'path': 'src/new.py'}
+    finally:
+        manager.close()
+
+    assert 'write' in calls
+    assert (tmp_path / 'src' / 'new.py').read_text() == 'code'
+
+
+def test_folder_replaced_by_symlink_outside_is_rejected(tmp_path):
+    root = tmp_path / 'workspace'
+    outside = tmp_path / 'outside'
+    (root / 'src').mkdir(parents=True)
+    (root / 'src' / 'a.txt').write_text('a')
+    outside.mkdir()
+    (outside / 'secret.txt').write_text('secret')
+    manager = FileManager(workspace_root=str(root), watch=False)
+    try:
+        assert manager.read_file('src/a.txt')['content'] == 'a'
+        version = manager.tree_index.version
+
+        shutil.rmtree(root / 'src')
+        os.symlink(outside, root / 'src')
+        manager.tree_index.mark_dirty('')
+
+        assert 'error' in manager.read_file('src/secret.txt')
+        changes = manager.tree_index.changes_since(version)
+        assert {(c['action'], c['path']) for c in changes} >= {('removed', 'src'), ('added', 'src')}
+    finally:
+        manager.close()
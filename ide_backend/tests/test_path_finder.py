@@ -0,0 +1,70 @@
+import os
+import pytest
+import path_finder
+from file_index import FileTreeIndex
+from path_finder import PathIndex
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('')
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for package in range(5):
+        for module in range(20):
+            touch(tmp_path / 'src' / f'pkg{package}' / f'module_{module}.py')
+    index = FileTreeIndex(str(tmp_path))
+    yield index
+    index.stop()
+
+
+def assert_matches_rebuild(index, tree):
+    assert len(index) == len(PathIndex(tree))
+    assert index._paths == sorted(tree.iter_files())
+    assert index._blob == '\n' + ''.join(f'/{path.lower()}\n' for path in index._paths)
+
+
+def test_changes_are_applied_without_rebuilding(tree, tmp_path):
+    index = PathIndex(tree)
+    assert len(index) == 100
+
+    touch(tmp_path / 'src' / 'New.py')
+    touch(tmp_path / 'docs' / 'guide' / 'intro.md')
+    tree.mark_dirty('')
+    tree.mark_dirty('src')
+    assert_matches_rebuild(index, tree)
+
+    os.rename(tmp_path / 'src' / 'pkg1', tmp_path / 'src' / 'renamed')
+    tree.note_rename(os.path.join('src', 'pkg1'), os.path.join('src', 'renamed'))
+    os.remove(tmp_path / 'src' / 'New.py')
+    tree.mark_dirty('src')
+    assert_matches_rebuild(index, tree)
+
+    os.rename(tmp_path / 'src' / 'pkg2' / 'module_3.py', tmp_path / 'src' / 'pkg2' / 'other.py')
+    (tmp_path / 'docs' / 'guide' / 'intro.md').unlink()
+    (tmp_path / 'docs' / 'guide').rmdir()
+    tree.mark_dirty(os.path.join('src', 'pkg2'))
+    tree.mark_dirty('docs')
+    assert_matches_rebuild(index, tree)
+
+    assert index.rebuilds == 1
+    assert index.updates == 3
+    assert index.find('renamed/module_1')[0]['path'] == os.path.join('src', 'renamed', 'module_1.py')
+
+
+def test_file_name_matches_rank_first(tree, tmp_path):
+    touch(tmp_path / 'src' / 'modules' / 'readme.txt')
+    tree.mark_dirty('src')
+    results = PathIndex(tree).find('module_1', 3)
+    assert [r['name'] for r in results] == ['module_1.py'] * 3
+    assert PathIndex(tree).find('mdl1')[0]['name'].startswith('module_1')
+    assert PathIndex(tree).find('zzz') == []
+
+
+def test_candidate_cap_bounds_scoring(tree, monkeypatch):
+    monkeypatch.setattr(path_finder, 'MAX_SCORED_CANDIDATES', 10)
+    results = PathIndex(tree).find('m', 5)
+    assert len(results) == 5
+    assert all(r['name'].startswith('m') for r in results)
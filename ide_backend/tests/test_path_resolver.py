@@ -0,0 +1,28 @@
+import os
+import shutil
+import pytest
+from path_resolver import PathEscapeError, PathResolver
+
+
+def test_cached_folder_replaced_by_symlink_is_rejected(tmp_path):
+    root = tmp_path / 'workspace'
+    outside = tmp_path / 'outside'
+    (root / 'src').mkdir(parents=True)
+    outside.mkdir()
+    (outside / 'secret.txt').write_text('secret')
+    resolver = PathResolver(str(root))
+    assert resolver.resolve('src/a.txt') == str(root / 'src' / 'a.txt')
+
+    shutil.rmtree(root / 'src')
+    os.symlink(outside, root / 'src')
+
+    with pytest.raises(PathEscapeError):
+        resolver.resolve('src/secret.txt')
+
+
+def test_cache_hit_for_unchanged_folder(tmp_path):
+    (tmp_path / 'src').mkdir()
+    resolver = PathResolver(str(tmp_path))
+    resolver.resolve('src/a.txt')
+    resolver.resolve('src/b.txt')
+    assert resolver.stats()['hits'] == 1
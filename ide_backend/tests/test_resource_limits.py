@@ -0,0 +1,50 @@
+import pytest
+import resource_limits
+from resource_limits import ResourceLimits
+from terminal_manager import TerminalSession
+
+
+@pytest.fixture
+def cgroup_parent(tmp_path):
+    """A directory standing in for a delegated cgroup v2 parent"""
+    (tmp_path / 'cgroup.controllers').write_text('cpu memory pids\n')
+    return tmp_path
+
+
+@pytest.mark.parametrize('name', ['', '.', '..', '../x', 'a/b', '/abs', 'x\0y'])
+def test_create_cgroup_rejects_names_that_are_not_one_component(cgroup_parent, name):
+    limits = ResourceLimits(max_pids=10, cgroup_parent=str(cgroup_parent))
+    with pytest.raises(ValueError):
+        limits.create_cgroup(name)
+    assert sorted(p.name for p in cgroup_parent.iterdir()) == ['cgroup.controllers', 'cgroup.subtree_control']
+
+
+def test_create_cgroup_makes_a_direct_child(cgroup_parent):
+    limits = ResourceLimits(memory_bytes=1 << 20, max_pids=10, cgroup_parent=str(cgroup_parent))
+    path = limits.create_cgroup('term-1')
+    assert path == str(cgroup_parent / 'term-1')
+    assert (cgroup_parent / 'term-1' / 'pids.max').read_text() == '10'
+
+
+def test_sessions_get_their_own_cgroup_even_with_the_same_client_id(tmp_path):
+    sessions = [TerminalSession('../term', str(tmp_path), None, None) for _ in range(2)]
+    names = {session.cgroup_name for session in sessions}
+    assert len(names) == 2
+    assert all(name.startswith('term-') and '/' not in name for name in names)
+
+
+def test_rlimit_fallback_leaves_process_cap_unenforced(monkeypatch):
+    limits = ResourceLimits(memory_bytes=1 << 30, max_pids=10)
+    assert limits.describe()['mode'] == 'rlimit'
+    assert limits.describe()['not_enforced'] == ['max_pids']
+
+    applied = []
+    monkeypatch.setattr(resource_limits.os, 'setsid', lambda: None)
+    monkeypatch.setattr(resource_limits.resource, 'setrlimit', lambda kind, value: applied.append(kind))
+    limits.preexec()()
+    assert applied == [resource_limits.resource.RLIMIT_AS]
+
+
+def test_cgroup_mode_enforces_process_cap(cgroup_parent):
+    limits = ResourceLimits(max_pids=10, cgroup_parent=str(cgroup_parent))
+    assert limits.describe()['not_enforced'] == []
@@ -0,0 +1,24 @@
+from terminal_manager import TerminalSession
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, **kwargs):
+        self.emitted.append((event, data))
+
+
+def test_queued_replay_goes_out_before_later_output(tmp_path):
+    socket_io = RecordingSocketIO()
+    session = TerminalSession('pool_test', str(tmp_path), socket_io, None)
+    session.detached = True
+    session.scrollback.write(b'prompt$ ')
+
+    session.attach('client', queue_replay=True)
+    # Output read after attaching, flushed before the replay would have been
+    session._pending.append(b'live')
+    session._pending_size += 4
+    session._flush_output()
+
+    assert socket_io.emitted == [('terminal_output', {'session_id': 'pool_test', 'data': 'prompt$ live'})]
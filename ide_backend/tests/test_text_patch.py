@@ -0,0 +1,49 @@
+import pytest
+from text_patch import DiffFormatError, PatchError, apply_unified_diff
+
+CONTENT = 'one\ntwo\nthree\n'
+
+
+def test_single_file_diff_applies():
+    diff = (
+        '--- a/notes.txt\n'
+        '+++ b/notes.txt\n'
+        '@@ -1,3 +1,3 @@\n'
+        ' one\n'
+        '-two\n'
+        '+2\n'
+        ' three\n'
+    )
+    assert apply_unified_diff(CONTENT, diff) == 'one\n2\nthree\n'
+
+
+@pytest.mark.parametrize('header', [
+    'diff --git a/other.txt b/other.txt\n--- a/other.txt\n+++ b/other.txt\n',
+    '--- a/other.txt\n+++ b/other.txt\n'
+])
+def test_two_file_diff_is_rejected(header):
+    diff = (
+        '--- a/notes.txt\n'
+        '+++ b/notes.txt\n'
+        '@@ -1,2 +1,2 @@\n'
+        ' one\n'
+        '-two\n'
+        '+2\n'
+        + header +
+        '@@ -3 +3 @@\n'
+        '-three\n'
+        '+3\n'
+    )
+    with pytest.raises(DiffFormatError):
+        apply_unified_diff(CONTENT, diff)
+
+
+def test_removed_line_starting_with_dashes_is_not_a_header():
+    content = 'a\n-- b\nc\n'
+    diff = '@@ -1,3 +1,2 @@\n a\n--- b\n c\n'
+    assert apply_unified_diff(content, diff) == 'a\nc\n'
+
+
+def test_mismatched_context_is_a_conflict():
+    with pytest.raises(PatchError):
+        apply_unified_diff(CONTENT, '@@ -1 +1 @@\n-zero\n+0\n')
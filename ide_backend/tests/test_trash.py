@@ -0,0 +1,49 @@
+import os
+import eventlet
+from blocking_io import BlockingIOPool
+from trash import TRASH_DIR, TrashCollector
+
+
+def make_leftover(root, job_id, files=50):
+    folder = os.path.join(root, TRASH_DIR, job_id, '0')
+    os.makedirs(folder)
+    for index in range(files):
+        open(os.path.join(folder, f'{index}.txt'), 'w').close()
+
+
+def wait_idle(*collectors):
+    with eventlet.Timeout(5):
+        while any(collector._worker is not None for collector in collectors):
+            eventlet.sleep(0.01)
+
+
+def test_workers_sharing_a_workspace_resume_each_leftover_once(tmp_path):
+    root = str(tmp_path)
+    make_leftover(root, 'aaa')
+    make_leftover(root, 'bbb')
+    io = BlockingIOPool()
+
+    first = TrashCollector(root, io, chunk_size=10)
+    second = TrashCollector(root, io, chunk_size=10)
+    wait_idle(first, second)
+
+    jobs = [job for collector in (first, second) for job in collector.jobs.values()]
+    assert sorted(job.id for job in jobs) == ['aaa', 'bbb']
+    assert [job.state for job in jobs] == ['done', 'done']
+    assert not os.path.exists(os.path.join(root, TRASH_DIR))
+
+
+def test_stopped_job_is_resumed_by_the_next_collector(tmp_path):
+    root = str(tmp_path)
+    make_leftover(root, 'aaa', files=200)
+    io = BlockingIOPool()
+
+    first = TrashCollector(root, io, chunk_size=10)
+    first.stop()
+    wait_idle(first)
+    assert first.jobs['aaa'].state in ('stopped', 'pending')
+
+    second = TrashCollector(root, io, chunk_size=10)
+    wait_idle(second)
+    assert second.jobs['aaa'].state == 'done'
+    assert not os.path.exists(os.path.join(root, TRASH_DIR))
@@ -0,0 +1,125 @@
+import re
+import hashlib
+
+_HUNK_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+_FILE_HEADER_PREFIXES = ('diff ', 'Index: ', '--- ', '+++ ')
+
+
+class PatchError(ValueError):
+    """Raised when a patch does not apply to the current file content"""
+
+
+class DiffFormatError(PatchError):
+    """Raised for a diff that cannot be applied to one file whatever its content"""
+
+
+def content_hash(content):
+    """Hash identifying a version of a text file's content"""
+    return hashlib.sha256(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def apply_edits(content, edits):
+    """Apply a list of {'offset', 'length', 'text'} edits to a string.
+
+    Offsets and lengths count Unicode code points in the base content.
+    Edits may come in any order but must not overlap.
+    """
+    parsed = []
+    for edit in edits:
+        try:
+            offset = int(edit['offset'])
+            length = int(edit.get('length', 0))
+            text = edit.get('text', '')
+        except (KeyError, TypeError, ValueError):
+            raise PatchError('Each edit needs an integer offset and length')
+        if not isinstance(text, str):
+            raise PatchError('Edit text must be a string')
+        if offset < 0 or length < 0 or offset + length > len(content):
+            raise PatchError(f'Edit at offset {offset} is out of range')
+        parsed.append((offset, length, text))
+
+    parsed.sort(key=lambda e: e[0])
+    pieces = []
+    position = 0
+    for offset, length, text in parsed:
+        if offset < position:
+            raise PatchError(f'Edit at offset {offset} overlaps a previous edit')
+        pieces.append(content[position:offset])
+        pieces.append(text)
+        position = offset + length
+    pieces.append(content[position:])
+    return ''.join(pieces)
+
+
+def _is_file_header(diff_lines, i):
+    """True if diff_lines[i] starts another file's diff"""
+    line = diff_lines[i]
+    if line.startswith('--- '):
+        # Otherwise a removed line that happens to start with '-- '
+        return i + 1 < len(diff_lines) and diff_lines[i + 1].startswith('+++ ')
+    return line.startswith(('diff ', 'Index: '))
+
+
+def apply_unified_diff(content, diff):
+    """Apply a single-file unified diff, verifying every context line.
+
+    Raises DiffFormatError if the diff has hunks for more than one file.
+    """
+    lines = content.splitlines(keepends=True)
+    diff_lines = diff.splitlines(keepends=True)
+    result = []
+    position = 0
+    i = 0
+    applied = 0
+
+    while i < len(diff_lines):
+        match = _HUNK_RE.match(diff_lines[i])
+        i += 1
+        if not match:
+            # File headers and anything outside a hunk; once a hunk was
+            # applied, another header means the diff is for several files
+            if applied and diff_lines[i - 1].startswith(_FILE_HEADER_PREFIXES):
+                raise DiffFormatError('Diff touches more than one file')
+            continue
+
+        old_start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        # A hunk that removes nothing inserts after line old_start
+        start = old_start - 1 if old_count else old_start
+        if start < position or start > len(lines):
+            raise PatchError(f'Hunk at line {old_start} does not apply')
+        result.extend(lines[position:start])
+        position = start
+
+        while i < len(diff_lines) and not diff_lines[i].startswith('@@'):
+            if _is_file_header(diff_lines, i):
+                break
+            line = diff_lines[i]
+            tag, text = line[:1], line[1:]
+            if line in ('\n', '\r\n'):
+                # Some tools strip the space from empty context lines
+                tag, text = ' ', line
+            if i + 1 < len(diff_lines) and diff_lines[i + 1].startswith('\\'):
+                # "\ No newline at end of file" refers to this line
+                text = text.rstrip('\r\n')
+            i += 1
+
+            if tag in (' ', '-'):
+                if position >= len(lines) or lines[position] != text:
+                    raise PatchError(f'Hunk at line {old_start} does not match the file content')
+                position += 1
+                if tag == ' ':
+                    result.append(text)
+            elif tag == '+':
+                result.append(text)
+            elif tag == '\\':
+                continue
+            else:
+                # Start of another file's diff
+                break
+        applied += 1
+
+    if not applied:
+        raise PatchError('Diff contains no hunks')
+    result.extend(lines[position:])
+    return ''.join(result)
@@ -0,0 +1,274 @@
+import os
+import time
+import fcntl
+import uuid
+import logging
+from collections import OrderedDict, deque
+from itertools import islice
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+# Hidden folder at the workspace root that deleted entries are moved into
+TRASH_DIR = '.ide-trash'
+# Suffix of the lock file next to each job folder, held while it is deleted
+LOCK_SUFFIX = '.lock'
+# Entries removed per worker thread call
+CHUNK_SIZE = 500
+# Minimum seconds between progress notifications of a job
+PROGRESS_INTERVAL = 0.25
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 100
+
+
+def _iter_removals(abs_path):
+    """Remove a folder bottom-up, yielding after each entry"""
+    for dirpath, dirnames, filenames in os.walk(abs_path, topdown=False):
+        for name in filenames:
+            try:
+                os.remove(os.path.join(dirpath, name))
+            except FileNotFoundError:
+                pass
+            yield
+        for name in dirnames:
+            path = os.path.join(dirpath, name)
+            try:
+                # Symlinked folders are listed here but never descended into
+                if os.path.islink(path):
+                    os.remove(path)
+                else:
+                    os.rmdir(path)
+            except FileNotFoundError:
+                pass
+            yield
+    try:
+        os.rmdir(abs_path)
+    except FileNotFoundError:
+        pass
+    yield
+
+
+def _lock(path):
+    """Open and exclusively lock ``path``; returns the descriptor, or None if held elsewhere"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _advance(removals, count):
+    """Run up to ``count`` removals; returns how many were done"""
+    return sum(1 for _ in islice(removals, count))
+
+
+class DeletionJob:
+    """Entries moved to the trash together and deleted in the background"""
+
+    def __init__(self, job_id, path):
+        self.id = job_id
+        self.path = path  # folder in the trash holding the entries
+        self.lock_fd = None  # held lock on path + LOCK_SUFFIX
+        self.paths = []  # workspace-relative paths the entries had
+        self.state = 'pending'
+        self.removed = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def info(self):
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'paths': self.paths,
+            'removed': self.removed,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+
+class TrashCollector:
+    """Deletes entries in the background after moving them out of the way.
+
+    ``move`` renames entries into a job folder under the hidden trash folder
+    at the workspace root, which is instant as it stays on the same file
+    system, so they vanish from the workspace at once. One greenlet then
+    empties the job folders in turn, removing ``chunk_size`` entries per
+    worker thread call and yielding to the hub in between, so even a large
+    ``node_modules`` never holds up other requests. Listeners get a job's
+    info when it starts, at most every ``PROGRESS_INTERVAL`` seconds while it
+    runs, and when it ends. Trash left by an interrupted run is deleted again
+    on start. Every job folder has a lock file next to it, held by the
+    process deleting it, so workers sharing a workspace each only resume
+    the leftovers nobody else is working on.
+    """
+
+    def __init__(self, root, io, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.trash_root = os.path.join(root, TRASH_DIR)
+        self.io = io
+        self.chunk_size = chunk_size
+        self.jobs = OrderedDict()  # job_id -> DeletionJob, oldest first
+        self._queue = deque()
+        self._listeners = []
+        self._worker = None
+        self._stopped = False
+        self._resume_leftovers()
+
+    def add_listener(self, callback):
+        """Register callback(info) for job progress"""
+        self._listeners.append(callback)
+
+    def new_job(self):
+        job_id = uuid.uuid4().hex[:12]
+        return DeletionJob(job_id, os.path.join(self.trash_root, job_id))
+
+    def move(self, job, abs_paths):
+        """Rename entries into a job's trash folder; returns error messages.
+
+        Only touches the file system, so it can run in a worker thread.
+        """
+        errors = []
+        # Locked before the folder exists, so no other worker can resume it
+        while job.lock_fd is None:
+            os.makedirs(self.trash_root, exist_ok=True)
+            try:
+                job.lock_fd = _lock(job.path + LOCK_SUFFIX)
+            except FileNotFoundError:
+                pass  # Another worker just removed the empty trash folder
+        os.makedirs(job.path)
+        for index, abs_path in enumerate(abs_paths):
+            try:
+                os.rename(abs_path, os.path.join(job.path, str(index)))
+                job.paths.append(os.path.relpath(abs_path, self.root))
+            except OSError as e:
+                errors.append(f'Error removing {os.path.basename(abs_path)}: {e}')
+        return errors
+
+    def submit(self, job):
+        """Queue a job for deletion once its entries have been moved"""
+        if not job.paths:
+            try:
+                os.rmdir(job.path)
+            except OSError:
+                pass
+            self._unlock(job, done=True)
+            return
+        self.jobs[job.id] = job
+        self._queue.append(job)
+        self._notify(job)
+        if self._worker is None and not self._stopped:
+            self._worker = eventlet.spawn(self._run)
+
+    def _resume_leftovers(self):
+        try:
+            names = os.listdir(self.trash_root)
+        except OSError:
+            return
+        resumed = 0
+        for name in names:
+            job_id = name[:-len(LOCK_SUFFIX)] if name.endswith(LOCK_SUFFIX) else name
+            if name != job_id and job_id in names:
+                continue
+            job = DeletionJob(job_id, os.path.join(self.trash_root, job_id))
+            job.lock_fd = _lock(job.path + LOCK_SUFFIX)
+            if job.lock_fd is None:
+                continue  # Another worker is deleting it
+            if not os.path.isdir(job.path):
+                # Finished (or left over from a crash just before unlocking)
+                self._unlock(job, done=True)
+                continue
+            job.paths.append(os.path.join(TRASH_DIR, job_id))
+            self.submit(job)
+            resumed += 1
+        if resumed:
+            logger.info(f'Deleting {resumed} leftover trash folders in {self.root}')
+
+    def _unlock(self, job, done):
+        """Release a job's lock, removing the lock file once the job folder is gone"""
+        if job.lock_fd is None:
+            return
+        if done:
+            try:
+                os.remove(job.path + LOCK_SUFFIX)
+            except FileNotFoundError:
+                pass
+        os.close(job.lock_fd)
+        job.lock_fd = None
+
+    def _run(self):
+        try:
+            while self._queue and not self._stopped:
+                self._delete(self._queue.popleft())
+            self._remove_empty_trash()
+        finally:
+            self._worker = None
+
+    def _delete(self, job):
+        job.state = 'running'
+        self._notify(job)
+        removals = _iter_removals(job.path)
+        notified = time.monotonic()
+        try:
+            while True:
+                count = self.io.run('purge', _advance, removals, self.chunk_size)
+                job.removed += count
+                if count < self.chunk_size:
+                    break
+                if self._stopped:
+                    # The rest is picked up again on the next start
+                    job.state = 'stopped'
+                    return
+                if time.monotonic() - notified >= PROGRESS_INTERVAL:
+                    notified = time.monotonic()
+                    self._notify(job)
+                eventlet.sleep(0)
+            job.state = 'done'
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+            logger.warning(f'Deleting {job.paths} from {self.root} failed: {e}')
+        finally:
+            self._unlock(job, done=job.state == 'done')
+            job.finished_at = time.time()
+            self._notify(job)
+            self._prune()
+
+    def _remove_empty_trash(self):
+        try:
+            os.rmdir(self.trash_root)
+        except OSError:
+            pass
+
+    def _notify(self, job):
+        info = job.info()
+        for callback in self._listeners:
+            try:
+                callback(info)
+            except Exception as e:
+                logger.warning(f'Deletion job listener failed: {e}')
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.finished_at is not None]
+        for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        return job.info() if job else None
+
+    def stats(self):
+        return {
+            'jobs': [job.info() for job in self.jobs.values()],
+            'queued': len(self._queue),
+            'running': self._worker is not None
+        }
+
+    def stop(self):
+        """Stop after the current chunk; remaining trash is deleted on the next start"""
+        self._stopped = True
+        for job in self._queue:
+            self._unlock(job, done=False)
@@ -0,0 +1,86 @@
+import os
+import time
+
+# Folder names tried in a terminal's working directory and its parents
+VENV_DIR_NAMES = ('venv', '.venv', 'env', '.env', 'virtualenv')
+# Working directory plus this many levels above it minus one
+VENV_SEARCH_DEPTH = 4
+# Seconds a probed directory's result is trusted
+DEFAULT_VENV_CACHE_TTL = 30.0
+
+
+def _has_activate(venv_path):
+    return os.path.exists(os.path.join(venv_path, 'bin', 'activate'))
+
+
+class VenvResolver:
+    """Finds the virtual environment a terminal should activate.
+
+    The backend's own venv wins; otherwise the working directory and up to
+    three parents are searched for the usual venv folder names. The result
+    for each probed directory is cached for ``ttl`` seconds, so opening
+    terminals in the same (or a sibling) folder costs no filesystem calls.
+    Venv folders are excluded from the watched tree, so the watcher never
+    sees them appear; ``invalidate`` is called when the workspace changes
+    and the TTL covers a venv created from a terminal.
+    """
+
+    def __init__(self, backend_dirs=(), ttl=DEFAULT_VENV_CACHE_TTL):
+        # Checked before the working directory, in order
+        self.backend_venvs = tuple(dict.fromkeys(os.path.join(d, 'venv') for d in backend_dirs))
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # directory -> (expires, venv path or None)
+
+    def _probe(self, key, probe):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        result = probe()
+        self._entries[key] = (now + self.ttl, result)
+        return result
+
+    def _backend_venv(self):
+        return next((v for v in self.backend_venvs if _has_activate(v)), None)
+
+    @staticmethod
+    def _dir_venv(directory):
+        for name in VENV_DIR_NAMES:
+            venv_path = os.path.join(directory, name)
+            if _has_activate(venv_path):
+                return venv_path
+        return None
+
+    def find(self, directory):
+        """Return the venv path for a working directory, or None"""
+        venv_path = self._probe(None, self._backend_venv)
+        if venv_path:
+            return venv_path
+
+        current_dir = os.path.abspath(directory) if directory else os.getcwd()
+        for _ in range(VENV_SEARCH_DEPTH):
+            venv_path = self._probe(current_dir, lambda d=current_dir: self._dir_venv(d))
+            if venv_path:
+                return venv_path
+            parent_dir = os.path.dirname(current_dir)
+            if parent_dir == current_dir:  # Reached root
+                break
+            current_dir = parent_dir
+        return None
+
+    def invalidate(self, directory=None):
+        """Forget cached results at and below a directory, or all of them"""
+        if directory is None:
+            self._entries.clear()
+            return
+        directory = os.path.abspath(directory)
+        prefix = directory.rstrip(os.sep) + os.sep
+        for key in [k for k in self._entries if k is not None and (k == directory or k.startswith(prefix))]:
+            del self._entries[key]
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
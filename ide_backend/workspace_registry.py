@@ -0,0 +1,155 @@
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+# Seconds without requests or watching clients before a workspace is closed
+DEFAULT_IDLE_TIMEOUT = 600
+# Open workspaces kept beyond which idle ones are closed right away
+DEFAULT_MAX_WORKSPACES = 16
+REAP_INTERVAL = 30
+
+
+def workspace_id(root):
+    """Stable id of a workspace root, the same in every worker and after restarts"""
+    return hashlib.sha1(root.encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+
+
+class UnknownWorkspace(KeyError):
+    """A request named a workspace id that was never opened"""
+
+
+class Workspace:
+    """One open workspace root and the FileManager serving it"""
+
+    def __init__(self, workspace_id, root, files):
+        self.id = workspace_id
+        self.root = root
+        self.files = files
+        self.clients = set()  # Socket.IO sids watching this workspace
+        self.last_used = time.monotonic()
+
+    def info(self):
+        return {'workspace_id': self.id, 'workspace': self.root}
+
+
+class WorkspaceRegistry:
+    """Opens a FileManager per workspace root on demand and closes idle ones.
+
+    Clients open a workspace by path and then address it by its id, so
+    users working on different projects get independent tree indexes,
+    caches and watchers instead of sharing one global workspace. Ids of
+    every workspace opened so far are remembered, so a workspace closed
+    while idle is transparently reopened by its next request. The default
+    workspace (requests without an id) is never closed.
+    """
+
+    def __init__(self, factory, default_root, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 max_workspaces=DEFAULT_MAX_WORKSPACES):
+        self.factory = factory  # factory(workspace_id, root) -> FileManager
+        self.idle_timeout = idle_timeout
+        self.max_workspaces = max_workspaces
+        self.opened = 0
+        self.closed = 0
+        self._roots = {}  # workspace_id -> root
+        self._open = OrderedDict()  # workspace_id -> Workspace, least recently used first
+        self._client_workspace = {}  # sid -> workspace_id
+        self.default = None
+        self.default = self.open(default_root)
+        self._reaper = eventlet.spawn(self._reap_loop) if idle_timeout else None
+
+    def open(self, path):
+        """Return the workspace for a directory, creating it if needed"""
+        root = os.path.normpath(os.path.abspath(os.path.expanduser(path)))
+        if not os.path.exists(root):
+            raise ValueError('Workspace path does not exist')
+        if not os.path.isdir(root):
+            raise ValueError('Workspace path is not a directory')
+        key = workspace_id(root)
+        self._roots[key] = root
+        return self.get(key)
+
+    def get(self, key=None):
+        """Return an open workspace by id (the default one for None)"""
+        if not key:
+            workspace = self.default
+        else:
+            workspace = self._open.get(key)
+            if workspace is None:
+                root = self._roots.get(key)
+                if root is None:
+                    raise UnknownWorkspace(key)
+                self._evict_over_limit(reserve=1)
+                workspace = Workspace(key, root, self.factory(key, root))
+                self._open[key] = workspace
+                self.opened += 1
+                logger.info(f'Opened workspace {key}: {root}')
+        self._open.move_to_end(workspace.id)
+        workspace.last_used = time.monotonic()
+        return workspace
+
+    def bind(self, sid, key=None):
+        """Attach a client to a workspace (leaving its previous one); returns (new, previous)"""
+        workspace = self.get(key)
+        previous = self.unbind(sid)
+        workspace.clients.add(sid)
+        self._client_workspace[sid] = workspace.id
+        return workspace, previous
+
+    def unbind(self, sid):
+        """Detach a client; returns the workspace it was bound to, or None"""
+        workspace = self._open.get(self._client_workspace.pop(sid, None))
+        if workspace is not None:
+            workspace.clients.discard(sid)
+            workspace.last_used = time.monotonic()
+        return workspace
+
+    def _is_idle(self, workspace, now):
+        return workspace is not self.default and not workspace.clients and \
+            now - workspace.last_used >= self.idle_timeout
+
+    def _close(self, workspace):
+        self._open.pop(workspace.id, None)
+        self.closed += 1
+        try:
+            workspace.files.close()
+        except Exception as e:
+            logger.warning(f'Error closing workspace {workspace.root}: {e}')
+        logger.info(f'Closed workspace {workspace.id}: {workspace.root}')
+
+    def _evict_over_limit(self, reserve=0):
+        excess = len(self._open) + reserve - self.max_workspaces
+        for workspace in list(self._open.values()):
+            if excess <= 0:
+                break
+            if workspace is not self.default and not workspace.clients:
+                self._close(workspace)
+                excess -= 1
+
+    def _reap_loop(self):
+        while True:
+            eventlet.sleep(min(REAP_INTERVAL, self.idle_timeout))
+            now = time.monotonic()
+            for workspace in list(self._open.values()):
+                if self._is_idle(workspace, now):
+                    self._close(workspace)
+
+    def stats(self):
+        return {
+            'open': [dict(w.info(), clients=len(w.clients)) for w in self._open.values()],
+            'known': len(self._roots),
+            'opened': self.opened,
+            'closed': self.closed
+        }
+
+    def close_all(self):
+        """Write out queued saves and stop every workspace's watcher"""
+        if self._reaper is not None:
+            self._reaper.kill()
+            self._reaper = None
+        for workspace in list(self._open.values()):
+            self._close(workspace)
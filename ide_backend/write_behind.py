@@ -0,0 +1,81 @@
+import os
+import logging
+import eventlet
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Coalesces rapid successive writes to the same file.
+
+    The first write queued for a path schedules a flush ``delay`` seconds
+    later; writes arriving before then only replace the pending content, so
+    a burst of saves costs a single disk write. ``write_func(abs_path,
+    content)`` performs the actual write.
+    """
+
+    def __init__(self, write_func, delay=0.5):
+        self.write_func = write_func
+        self.delay = delay
+        self.coalesced = 0
+        self.flushed = 0
+        self._pending = {}  # abs_path -> content
+        self._timers = {}
+
+    def enqueue(self, abs_path, content):
+        if abs_path in self._pending:
+            self.coalesced += 1
+        self._pending[abs_path] = content
+        if abs_path not in self._timers:
+            self._timers[abs_path] = eventlet.spawn_after(self.delay, self._flush_one, abs_path)
+
+    def get_pending(self, abs_path):
+        """Return content queued for a file but not yet written, or None"""
+        return self._pending.get(abs_path)
+
+    def _matching(self, abs_path, folder):
+        if abs_path is None:
+            return list(self._pending)
+        if not folder:
+            return [abs_path] if abs_path in self._pending else []
+        prefix = abs_path.rstrip(os.sep) + os.sep
+        return [p for p in self._pending if p == abs_path or p.startswith(prefix)]
+
+    def _flush_one(self, abs_path):
+        timer = self._timers.pop(abs_path, None)
+        if timer is not None and timer is not eventlet.getcurrent():
+            timer.cancel()
+        if abs_path not in self._pending:
+            return None
+        content = self._pending.pop(abs_path)
+        try:
+            self.write_func(abs_path, content)
+            self.flushed += 1
+            return None
+        except Exception as e:
+            logger.error(f'Deferred write to {abs_path} failed: {e}')
+            return f'{abs_path}: {e}'
+
+    def flush(self, abs_path=None, folder=False):
+        """Write pending content now; returns a list of error messages"""
+        errors = []
+        for path in self._matching(abs_path, folder):
+            error = self._flush_one(path)
+            if error:
+                errors.append(error)
+        return errors
+
+    def discard(self, abs_path, folder=False):
+        """Drop pending writes, e.g. for a file that is being deleted"""
+        for path in self._matching(abs_path, folder):
+            timer = self._timers.pop(path, None)
+            if timer is not None:
+                timer.cancel()
+            self._pending.pop(path, None)
+
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'coalesced': self.coalesced,
+            'flushed': self.flushed
+        }